@@ -17,8 +17,9 @@ url = ""
 response = requests.get(url)
 soup = BeautifulSoup(response.text, "html.parser")
 
-# Extract raw text content
-text_content = soup.get_text(separator="\n", strip=True)
+# Extract the page text without nav/footer boilerplate, trimmed to a token budget
+from models.Preprocessing.condense import PageCondenser, page_blocks
+text_content = PageCondenser().condense(page_blocks(soup), token_budget=1500)
 
 # Define the system prompt
 system_msg = SystemMessage(content="""
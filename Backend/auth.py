@@ -0,0 +1,69 @@
+import os
+import secrets
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# Session tokens issued by /api/login: the user id signed with SECRET_KEY and
+# a timestamp. Clients send it as "Authorization: Bearer <token>", or browsers
+# get it back in the session cookie that login sets.
+SESSION_COOKIE = "session"
+TOKEN_MAX_AGE = int(os.getenv("AUTH_TOKEN_MAX_AGE", str(7 * 24 * 3600)))
+
+_serializer: Optional[URLSafeTimedSerializer] = None
+_bearer = HTTPBearer(auto_error=False)
+
+
+def get_serializer() -> URLSafeTimedSerializer:
+    global _serializer
+    if _serializer is None:
+        secret = os.getenv("SECRET_KEY")
+        if not secret:
+            # Fine for local runs; tokens stop working on restart and aren't shared between workers
+            print("SECRET_KEY not set; using a random key, so sessions won't survive a restart.")
+            secret = secrets.token_hex(32)
+        _serializer = URLSafeTimedSerializer(secret, salt="session")
+    return _serializer
+
+
+def issue_token(user_id: int) -> str:
+    return get_serializer().dumps({"user_id": user_id})
+
+
+def token_user_id(token: str) -> Optional[int]:
+    """The user id a token was issued for, or None if it is forged, malformed or expired."""
+    try:
+        data = get_serializer().loads(token, max_age=TOKEN_MAX_AGE)
+    except BadSignature:
+        return None
+    user_id = data.get("user_id") if isinstance(data, dict) else None
+    return user_id if isinstance(user_id, int) else None
+
+
+def _request_token(request: Request, credentials: Optional[HTTPAuthorizationCredentials]) -> Optional[str]:
+    if credentials is not None:
+        return credentials.credentials
+    return request.cookies.get(SESSION_COOKIE)
+
+
+async def optional_user_id(
+    request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)
+) -> Optional[int]:
+    """The logged-in user's id, None for anonymous callers; a bad token is still a 401."""
+    token = _request_token(request, credentials)
+    if token is None:
+        return None
+    user_id = token_user_id(token)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired session",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return user_id
+
+
+async def current_user_id(user_id: Optional[int] = Depends(optional_user_id)) -> int:
+    """The logged-in user's id; 401 if the caller isn't logged in."""
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Not logged in", headers={"WWW-Authenticate": "Bearer"})
+    return user_id
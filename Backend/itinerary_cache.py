@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# TripRequest fields that decide what the model generates
+KEY_FIELDS = ("destination", "budget", "days", "startDate", "endDate", "transport", "requirement", "child")
+
+
+def canonical_request(data: Dict) -> Dict:
+    """Normalize a trip request so trivially different payloads share a cache entry."""
+    canonical = {}
+    for field in KEY_FIELDS:
+        value = data.get(field)
+        if field == "budget" and value is not None:
+            value = float(value)
+        elif field == "days" and value is not None:
+            value = int(value)
+        elif field == "child":
+            value = bool(value)
+        elif isinstance(value, str):
+            value = " ".join(value.split())
+            if field in ("destination", "transport", "requirement"):
+                value = value.casefold()
+        canonical[field] = value
+    return canonical
+
+
+def make_cache_key(data: Dict, model: str, prompt_version: str) -> str:
+    """sha256 over the canonical request plus the model and prompt version."""
+    payload = json.dumps(
+        {"request": canonical_request(data), "model": model, "prompt_version": prompt_version},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ItineraryCache:
+    """
+    Two-tier cache for generated itineraries.
+
+    A small in-memory LRU sits in front of a SQLite table that survives restarts.
+    Entries expire after `ttl` seconds (None disables expiry) and the disk tier
+    is trimmed, least recently used first, once it exceeds `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        path: str = "./itinerary_cache.db",
+        memory_entries: int = 256,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[float] = 7 * 24 * 3600,
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS itinerary_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_itinerary_cache_accessed ON itinerary_cache (accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM itinerary_cache").fetchone()[0]
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _remember(self, key: str, value: str, created_at: float):
+        with self._memory_lock:
+            self._memory[key] = (created_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_memory(self, key: str) -> Optional[str]:
+        """Memory-tier lookup only; cheap enough to call on the event loop."""
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if self._expired(created_at, time.time()):
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+        self.stats["memory_hits"] += 1
+        return value
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM itinerary_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            value, created_at = row
+            if self._expired(created_at, now):
+                self._delete(key)
+                self._conn.commit()
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE itinerary_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+
+        self._remember(key, value, created_at)
+        self.stats["disk_hits"] += 1
+        return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._delete(key)
+            self._conn.execute(
+                "INSERT INTO itinerary_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._total_bytes += size
+            self._evict()
+            self._conn.commit()
+        self._remember(key, value, now)
+        self.stats["sets"] += 1
+
+    def _delete(self, key: str):
+        row = self._conn.execute("SELECT size FROM itinerary_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM itinerary_cache WHERE key = ?", (key,))
+            self._total_bytes -= row[0]
+
+    def _evict(self):
+        if self.ttl is not None:
+            cutoff = time.time() - self.ttl
+            expired = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM itinerary_cache WHERE created_at < ?", (cutoff,)
+            ).fetchone()
+            if expired[0]:
+                self._conn.execute("DELETE FROM itinerary_cache WHERE created_at < ?", (cutoff,))
+                self._total_bytes -= expired[1]
+                self.stats["evictions"] += expired[0]
+
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM itinerary_cache ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM itinerary_cache WHERE key = ?", (key,))
+                with self._memory_lock:
+                    self._memory.pop(key, None)
+                self._total_bytes -= size
+                self.stats["evictions"] += 1
+
+    async def aget(self, key: str) -> Optional[str]:
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str):
+        await asyncio.to_thread(self.set, key, value)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_itinerary_cache: Optional[ItineraryCache] = None
+
+
+def get_itinerary_cache() -> ItineraryCache:
+    global _itinerary_cache
+    if _itinerary_cache is None:
+        ttl = float(os.getenv("ITINERARY_CACHE_TTL", str(7 * 24 * 3600)))
+        _itinerary_cache = ItineraryCache(
+            path=os.getenv("ITINERARY_CACHE_PATH", "./itinerary_cache.db"),
+            memory_entries=int(os.getenv("ITINERARY_CACHE_MEMORY_ENTRIES", "256")),
+            max_bytes=int(os.getenv("ITINERARY_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            ttl=ttl if ttl > 0 else None,
+        )
+    return _itinerary_cache
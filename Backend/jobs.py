@@ -0,0 +1,236 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+Handler = Callable[[Dict], Awaitable[Dict]]
+
+# Longest a worker sleeps after its own loop fails (e.g. the job database is locked)
+MAX_WORKER_BACKOFF = 30.0
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying can't help (bad payload); the job fails on this attempt."""
+
+
+class JobStore:
+    """
+    SQLite-backed job table.
+
+    A claimed job becomes invisible to other workers for `visibility_timeout`
+    seconds. If the worker dies (or the process restarts) before completing it,
+    the job becomes claimable again once that window passes, until it runs out
+    of attempts.
+    """
+
+    def __init__(self, path: str = "./jobs.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                visible_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_claim ON jobs (status, visible_at)")
+
+    def enqueue(self, kind: str, payload: Dict, max_attempts: int = 3) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, visible_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), max_attempts, now, now, now),
+            )
+        return job_id
+
+    def claim(self, visibility_timeout: float) -> Optional[Dict]:
+        """Take the oldest visible job (queued, or running with an expired lease)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Leases that expired on their last attempt are given up on
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'Visibility timeout exceeded'), "
+                    "updated_at = ? WHERE status = 'running' AND visible_at <= ? AND attempts >= max_attempts",
+                    (now, now),
+                )
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status IN ('queued', 'running') AND visible_at <= ? "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, visible_at = ?, updated_at = ? "
+                        "WHERE id = ?",
+                        (now + visibility_timeout, now, row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = dict(row)
+        job["attempts"] += 1
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def complete(self, job_id: str, result: Dict):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (json.dumps(result), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str, retry_delay: float = 0, permanent: bool = False):
+        """Record a failed attempt; requeue the job unless it is out of attempts or `permanent`."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET error = ?, updated_at = ?, "
+                "status = CASE WHEN attempts < max_attempts AND NOT ? THEN 'queued' ELSE 'failed' END, "
+                "visible_at = ? WHERE id = ?",
+                (error, now, permanent, now + retry_delay, job_id),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """
+    Bounded pool of asyncio workers pulling jobs from a JobStore.
+
+    Handlers are registered per job kind. A handler returns a JSON-serializable
+    dict on success; any exception counts as a failed attempt and the job is
+    retried with exponential backoff until `max_attempts` is reached, except
+    PermanentJobError, which fails the job straight away.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = 4,
+        visibility_timeout: float = 300,
+        poll_interval: float = 1.0,
+        retry_backoff: float = 2.0,
+    ):
+        self.store = store
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self._handlers: Dict[str, Handler] = {}
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, handler: Handler):
+        self._handlers[kind] = handler
+
+    async def submit(self, kind: str, payload: Dict, max_attempts: int = 3) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job_id = await asyncio.to_thread(self.store.enqueue, kind, payload, max_attempts)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        errors = 0
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim, self.visibility_timeout)
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run(job)
+                errors = 0
+            except Exception as e:
+                # A store error must not kill the worker; a claimed job is retried once its lease expires
+                errors += 1
+                delay = min(self.poll_interval * 2 ** errors, MAX_WORKER_BACKOFF)
+                print(f"Job worker error, retrying in {delay:.0f}s:", e)
+                await asyncio.sleep(delay)
+
+    async def _run(self, job: Dict):
+        handler = self._handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for job kind: {job['kind']}")
+            result = await asyncio.wait_for(handler(job["payload"]), timeout=self.visibility_timeout)
+        except asyncio.CancelledError:
+            # Shutting down: leave the lease to expire so the job is picked up after restart
+            raise
+        except Exception as e:
+            print(f"Job {job['id']} attempt {job['attempts']} failed:", e)
+            delay = self.retry_backoff ** job["attempts"]
+            permanent = isinstance(e, PermanentJobError)
+            await asyncio.to_thread(self.store.fail, job["id"], str(e), delay, permanent)
+            return
+        await asyncio.to_thread(self.store.complete, job["id"], result)
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            JobStore(os.getenv("JOB_STORE_PATH", "./jobs.db")),
+            workers=int(os.getenv("JOB_WORKERS", "4")),
+            visibility_timeout=float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300")),
+        )
+    return _job_queue
@@ -0,0 +1,137 @@
+import asyncio
+import os
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+
+from metrics import LLMCallMetrics
+
+load_dotenv()
+
+# Models used across the backend
+FINE_TUNED_MODEL = os.getenv("MODEL_ID", "ft:gpt-4o-mini-2024-07-18:personal:ai-trip-planner-final:BTKhoUKU")
+CHAT_MODEL = "gpt-3.5-turbo"
+
+
+class LLMClient:
+    """
+    Async OpenAI chat client shared by every call site.
+
+    All requests go through one pooled httpx transport, and a semaphore caps how
+    many completions are in flight at once so a burst of itinerary requests
+    queues locally instead of tripping upstream rate limits. `base_url` can point
+    at any OpenAI-compatible server (e.g. a local fake for testing).
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 64,
+        max_connections: int = 100,
+        timeout: float = 60.0,
+        max_retries: int = 2,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+            )
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def create(self, messages: List[Dict], model: str = CHAT_MODEL, **kwargs):
+        """Run a chat completion and return the raw response object."""
+        async with self._semaphore:
+            with LLMCallMetrics(model, "create") as call:
+                response = await self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+                call.record_usage(response.usage)
+                return response
+
+    async def complete(self, messages: List[Dict], model: str = CHAT_MODEL, **kwargs) -> str:
+        """Run a chat completion and return the stripped reply text."""
+        response = await self.create(messages, model=model, **kwargs)
+        return (response.choices[0].message.content or "").strip()
+
+    async def parse(self, messages: List[Dict], response_format, model: str = CHAT_MODEL, **kwargs):
+        """Run a schema-constrained completion and return the parsed pydantic object."""
+        async with self._semaphore:
+            with LLMCallMetrics(model, "parse") as call:
+                response = await self.client.chat.completions.parse(
+                    model=model, messages=messages, response_format=response_format, **kwargs
+                )
+                call.record_usage(response.usage)
+        return response.choices[0].message.parsed
+
+    async def stream(self, messages: List[Dict], model: str = CHAT_MODEL, **kwargs) -> AsyncIterator[str]:
+        """Run a streaming chat completion and yield content deltas as they arrive."""
+        # Ask for the usage chunk at the end of the stream so tokens get counted
+        kwargs.setdefault("stream_options", {"include_usage": True})
+        async with self._semaphore:
+            with LLMCallMetrics(model, "stream") as call:
+                stream = await self.client.chat.completions.create(
+                    model=model, messages=messages, stream=True, **kwargs
+                )
+                try:
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                        if getattr(chunk, "usage", None) is not None:
+                            call.record_usage(chunk.usage)
+                finally:
+                    await stream.close()
+
+
+_llm_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "64")),
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+            timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+        )
+    return _llm_client
+
+
+async def close_llm_client():
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
+
+
+async def complete(messages: List[Dict], model: str = CHAT_MODEL, **kwargs) -> str:
+    """Shortcut for get_llm_client().complete(...)."""
+    return await get_llm_client().complete(messages, model=model, **kwargs)
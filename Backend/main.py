@@ -2,24 +2,44 @@ import uvicorn
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import openai
 from dotenv import load_dotenv
 import os
-import requests
-from models.finetune.generate_itinerary import generate_itinerary  # Renamed for clarity
+import json
+import asyncio
+import uuid
+import httpx
+from models.finetune.generate_itinerary import (  # Renamed for clarity
+    generate_itinerary, stream_itinerary, itinerary_cache_key, missing_field, describe_error
+)
 
-from typing import Optional,TypedDict
+from typing import Dict, List, Optional,TypedDict
 from user_api import user_api
+from weather import get_weather_client, close_weather_client
+from llm_client import CHAT_MODEL, complete, close_llm_client
+from itinerary_cache import get_itinerary_cache
+from singleflight import SingleFlight
+from jobs import PermanentJobError, get_job_queue
+from models.Agent.itinerary_parser import ItineraryParser
+from models.Agent.food import start_planning, submit_feedback, get_planning, close_planner
+from models.catalog.search import get_package_index, parse_query
+from models.catalog.recommend import get_recommender
+from models.catalog.retrieval import get_retriever, watch_corpus
+from tokens import count_tokens
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from passlib.context import CryptContext
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from database import get_db  # You need a get_db dependency for SQLAlchemy session
-from models import user  # Your SQLAlchemy User model
-from database import engine, get_db
-# from models.user import User
+from models.user import User
+from models.trip import Trip, list_trips
+from models.itinerary_blob import store_itinerary, open_trip
+from models.trip_days import store_segments, trip_segments, segments_etag, day_etag, trip_overview, trip_day
+from database import SessionLocal, get_db, init_db
+from passwords import get_password_hasher, close_password_hasher
+from auth import SESSION_COOKIE, TOKEN_MAX_AGE, current_user_id, issue_token, optional_user_id
+from metrics import CONTENT_TYPE, REGISTRY, InstrumentedRoute, StatsCollector, render_metrics
 import uvicorn
 
 # Load environment variables from .env
@@ -27,14 +47,14 @@ load_dotenv()
 
 # Set API keys from environment
 API_KEY = os.getenv("API_KEY")
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
-# Create tables
-from database import Base
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Latency and in-flight metrics for every route below, served at /metrics
+app.router.route_class = InstrumentedRoute
+REGISTRY.register(StatsCollector(
+    "itinerary_cache_events_total", "Itinerary cache hits, misses, writes and evictions.",
+    lambda: get_itinerary_cache().stats, "event",
+))
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -54,29 +74,54 @@ async def get_weather(city: str):
     if not city:
         return {"error": "City name is required"}
 
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={API_KEY}&units=metric"
-
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-
-        if "main" not in data or "weather" not in data:
-            return {"error": "Unexpected response from weather API"}
+        return await get_weather_client().current(city)
 
-        return {
-            "city": data.get("name", city),
-            "temperature": round(data["main"]["temp"], 1),
-            "description": data["weather"][0]["description"]
-        }
-
-    except requests.exceptions.HTTPError as e:
+    except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             return {"error": "City not found"}
         return {"error": "Weather API error"}
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/metrics")
+async def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.on_event("startup")
+async def create_tables():
+    await init_db()
+
+@app.on_event("startup")
+async def start_workers():
+    queue = get_job_queue()
+    queue.register("itinerary", run_itinerary_job)
+    queue.start()
+
+@app.on_event("startup")
+async def load_catalog():
+    # Build the package search index and recommender once, off the event loop
+    index = await asyncio.to_thread(get_package_index)
+    await asyncio.to_thread(get_recommender)
+    await asyncio.to_thread(get_retriever)
+    # Load tiktoken now (it may download its encoding) rather than on the first prompt
+    await asyncio.to_thread(count_tokens, "warm up")
+    global corpus_watcher
+    corpus_watcher = asyncio.create_task(watch_corpus())
+    print(f"Catalog index ready: {len(index)} packages")
+
+corpus_watcher: Optional[asyncio.Task] = None
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    if corpus_watcher is not None:
+        corpus_watcher.cancel()
+    await get_job_queue().stop()
+    await close_weather_client()
+    await close_llm_client()
+    close_password_hasher()
+    await close_planner()
+
 # Chat endpoint
 class Message(BaseModel):
     message: str
@@ -84,8 +129,8 @@ class Message(BaseModel):
 @app.post("/chat")
 async def chat_endpoint(message: Message):
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+        reply = await complete(
+            model=CHAT_MODEL,
             messages=[
                 {"role": "system", "content": "You are an AI travel assistant and customer support expert."},
                 {"role": "user", "content": message.message}
@@ -93,7 +138,6 @@ async def chat_endpoint(message: Message):
             max_tokens=100,
             temperature=0.7
         )
-        reply = response.choices[0].message["content"].strip()
         return {"reply": reply}
     except Exception as e:
         print("OpenAI Error:", e)
@@ -110,31 +154,334 @@ class TripRequest(BaseModel):
     requirement: str
     child: bool
 
+def validate_trip(trip: TripRequest):
+    # Validate dates
+    if trip.startDate > trip.endDate:
+        raise HTTPException(status_code=400, detail="Start date cannot be after end date")
+
+    # Validate days
+    if trip.days <= 0:
+        raise HTTPException(status_code=400, detail="Number of days must be positive")
+
+    # Validate budget
+    if trip.budget <= 0:
+        raise HTTPException(status_code=400, detail="Budget must be positive")
+
+itinerary_flights = SingleFlight()
+
+async def cached_itinerary(data: dict) -> dict:
+    """Cache lookup, then a coalesced generate_itinerary call that fills the cache."""
+    cache = get_itinerary_cache()
+    cache_key = itinerary_cache_key(data)
+    cached = await cache.aget(cache_key)
+    if cached is not None:
+        return {"itinerary": cached}
+
+    async def generate_and_cache():
+        result = await generate_itinerary(data)
+        if "error" not in result:
+            await cache.aset(cache_key, result["itinerary"])
+        return result
+
+    # Identical requests arriving together share one model call
+    return await itinerary_flights.do(cache_key, generate_and_cache)
+
+async def save_trip(db: AsyncSession, user_id: int, trip: TripRequest, itinerary: str) -> int:
+    row = Trip(
+        user_id=user_id,
+        destination=trip.destination,
+        days=trip.days,
+        budget=trip.budget,
+        start_date=trip.startDate,
+        end_date=trip.endDate,
+        request=json.dumps(trip.model_dump()),
+        blob_hash=await store_itinerary(db, itinerary),
+        segments=await store_segments(db, itinerary),
+    )
+    db.add(row)
+    await db.commit()
+    return row.id
+
 @app.post("/trip/itinerary")
-async def create_trip_itinerary(trip: TripRequest):
+async def create_trip_itinerary(trip: TripRequest, user_id: Optional[int] = Depends(optional_user_id),
+                                db: AsyncSession = Depends(get_db)):
+    """Generate an itinerary; for a logged-in user it is also saved to their trip history."""
     try:
-        # Validate dates
-        if trip.startDate > trip.endDate:
-            raise HTTPException(status_code=400, detail="Start date cannot be after end date")
-        
-        # Validate days
-        if trip.days <= 0:
-            raise HTTPException(status_code=400, detail="Number of days must be positive")
-            
-        # Validate budget
-        if trip.budget <= 0:
-            raise HTTPException(status_code=400, detail="Budget must be positive")
-            
-        result = generate_itinerary(trip.model_dump())   
+        validate_trip(trip)
+        if user_id is not None and await db.get(User, user_id) is None:
+            raise HTTPException(status_code=401, detail="Not logged in")
+
+        result = await cached_itinerary(trip.model_dump())
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
-        return {"itinerary": result["itinerary"]}
+        response = {"itinerary": result["itinerary"]}
+        if user_id is not None:
+            response["trip_id"] = await save_trip(db, user_id, trip, result["itinerary"])
+        return response
     except HTTPException as he:
         raise he
     except Exception as e:
         print("Error creating itinerary:", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+# Background job mode: accept now, generate on the worker pool, poll for the result
+async def run_itinerary_job(payload: dict) -> dict:
+    # A bad payload fails the same way every time, so don't retry it
+    field = missing_field(payload)
+    if field:
+        raise PermanentJobError(f"Missing required field: {field}")
+    # user_id is added by create_trip_job from the submitter's session, never by the client
+    user_id = payload.get("user_id")
+    trip = TripRequest(**payload)
+    result = await cached_itinerary(trip.model_dump())
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    response = {"itinerary": result["itinerary"]}
+    if user_id is not None:
+        async with SessionLocal() as db:
+            # The account may have gone while the job was queued
+            if await db.get(User, user_id) is not None:
+                response["trip_id"] = await save_trip(db, user_id, trip, result["itinerary"])
+    return response
+
+@app.post("/trip/jobs", status_code=202)
+async def create_trip_job(trip: TripRequest, user_id: Optional[int] = Depends(optional_user_id),
+                          db: AsyncSession = Depends(get_db)):
+    validate_trip(trip)
+    if user_id is not None and await db.get(User, user_id) is None:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    job_id = await get_job_queue().submit("itinerary", {**trip.model_dump(), "user_id": user_id})
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/trip/jobs/{job_id}")
+async def get_trip_job(job_id: str):
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job["error"] if job["status"] == "failed" else None,
+    }
+
+# Interactive planning: generate, collect feedback over HTTP, regenerate rejected days
+class PlanFeedback(BaseModel):
+    approved: bool
+    rejected_days: List[int] = []
+    rejected_sections: Dict[str, List[str]] = {}
+    comment: str = ""
+
+@app.post("/trip/plan")
+async def start_trip_plan(trip: TripRequest):
+    validate_trip(trip)
+    try:
+        return await start_planning(uuid.uuid4().hex, trip.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/trip/plan/{thread_id}")
+async def get_trip_plan(thread_id: str):
+    plan = await get_planning(thread_id)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return plan
+
+@app.post("/trip/plan/{thread_id}/feedback")
+async def send_trip_plan_feedback(thread_id: str, feedback: PlanFeedback):
+    plan = await get_planning(thread_id)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    if not plan["awaiting_feedback"]:
+        raise HTTPException(status_code=409, detail="Plan is already finalized")
+    try:
+        return await submit_feedback(thread_id, feedback.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+@app.post("/trip/itinerary/stream")
+async def stream_trip_itinerary(trip: TripRequest):
+    """
+    Server-sent events variant of /trip/itinerary.
+
+    Emits `data: {"delta": ...}` for every chunk of model output, plus
+    `event: structure` day/activity events from ItineraryParser as lines
+    complete, then a final `event: done` carrying the full itinerary (or
+    `event: error` with a detail).
+    """
+    validate_trip(trip)
+    data = trip.model_dump()
+    field = missing_field(data)
+    if field:
+        raise HTTPException(status_code=500, detail=f"Missing required field: {field}")
+
+    cache = get_itinerary_cache()
+    cache_key = itinerary_cache_key(data)
+    cached = await cache.aget(cache_key)
+
+    async def events():
+        if cached is not None:
+            yield sse_event({"delta": cached})
+            yield sse_event({"itinerary": cached}, event="done")
+            return
+
+        parts = []
+        parser = ItineraryParser()
+        try:
+            async for delta in stream_itinerary(data):
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+                for structure in parser.feed(delta):
+                    yield sse_event(structure, event="structure")
+            for structure in parser.close():
+                yield sse_event(structure, event="structure")
+        except Exception as e:
+            print("Error streaming itinerary:", e)
+            yield sse_event({"detail": describe_error(e)}, event="error")
+            return
+
+        # Only a stream that ran to the end gets here (errors and disconnects
+        # leave above), and an empty reply isn't worth caching either
+        itinerary = "".join(parts).strip()
+        if not itinerary:
+            yield sse_event({"detail": "Failed to generate itinerary: the model returned no text"}, event="error")
+            return
+        await cache.aset(cache_key, itinerary)
+        yield sse_event({"itinerary": itinerary}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Catalog search: answered from the in-memory index, no model call
+@app.get("/packages/search")
+async def search_packages(
+    q: str = "",
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_days: Optional[int] = None,
+    max_days: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+):
+    """
+    Search tour packages by text with optional filters.
+
+    Budgets and durations written into `q` ("4-day heritage trip under ₹15000")
+    are applied as filters unless given explicitly.
+    """
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset cannot be negative")
+    parsed = parse_query(q)
+    if max_price is None:
+        max_price = parsed.get("max_price")
+    if min_days is None and max_days is None and "days" in parsed:
+        min_days = max_days = parsed["days"]
+    result = get_package_index().search(
+        parsed["text"], category=category, min_price=min_price, max_price=max_price,
+        min_days=min_days, max_days=max_days, limit=limit, offset=offset,
+    )
+    return {
+        "total": result["total"],
+        "limit": limit,
+        "offset": offset,
+        "filters": {"category": category, "min_price": min_price, "max_price": max_price,
+                    "min_days": min_days, "max_days": max_days},
+        "results": result["results"],
+    }
+
+@app.get("/packages/{package_id}/similar")
+async def similar_packages(package_id: int, k: int = 10):
+    recommender = get_recommender()
+    if not 0 <= package_id < len(recommender):
+        raise HTTPException(status_code=404, detail="Package not found")
+    if not 1 <= k <= 50:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 50")
+    return {"package": recommender.packages[package_id], "similar": recommender.similar_to(package_id, k)}
+
+@app.post("/trip/recommendations")
+async def recommend_packages(trip: TripRequest, k: int = 10):
+    """Catalog packages closest to a trip request's destination, style, length and budget."""
+    if not 1 <= k <= 50:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 50")
+    packages = get_recommender().recommend(
+        text=f"{trip.destination} {trip.requirement}", days=trip.days, price=trip.budget, k=k
+    )
+    return {"packages": packages}
+
+# Trip history of the logged-in user: newest first, keyset-paginated with an opaque cursor
+@app.get("/api/user/trips")
+async def user_trips(limit: int = 20, cursor: Optional[str] = None, user_id: int = Depends(current_user_id),
+                     db: AsyncSession = Depends(get_db)):
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    try:
+        trips, next_cursor = await list_trips(db, user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"trips": trips, "next_cursor": next_cursor}
+
+@app.get("/api/user/trips/{trip_id}")
+async def user_trip(trip_id: int, user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_db)):
+    opened = await open_trip(db, trip_id)
+    if opened is None or opened[0].user_id != user_id:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    trip, itinerary = opened
+    return {**trip.summary(), "request": json.loads(trip.request), "itinerary": itinerary}
+
+# Lazy itinerary for saved trips: the overview first, then one day per request.
+# Only the logged-in owner can read a trip; anyone else gets 404. Stored segments
+# never change, so a matching If-None-Match always means 304.
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    return header.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+def etag_response(request: Request, response: Response, etag: str) -> Optional[Response]:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+@app.get("/trip/{trip_id}")
+async def get_trip(trip_id: int, request: Request, response: Response,
+                   user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_db)):
+    """Summary, cost breakdown, considerations and day titles, without the days themselves."""
+    segments = await trip_segments(db, trip_id, user_id)
+    if segments is None:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    not_modified = etag_response(request, response, segments_etag(segments))
+    if not_modified:
+        return not_modified
+    return await trip_overview(db, await db.get(Trip, trip_id), segments)
+
+@app.get("/trip/{trip_id}/day/{day}")
+async def get_trip_day(trip_id: int, day: int, request: Request, response: Response, format: str = "markdown",
+                       user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_db)):
+    """One day of a saved trip, as markdown or (format=structured) parsed like /trip/plan's days."""
+    if format not in ("markdown", "structured"):
+        raise HTTPException(status_code=400, detail="format must be markdown or structured")
+    segments = await trip_segments(db, trip_id, user_id)
+    if segments is None:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    if not 1 <= day <= len(segments["days"]):
+        raise HTTPException(status_code=404, detail=f"Trip has {len(segments['days'])} days")
+    structured = format == "structured"
+    not_modified = etag_response(request, response, day_etag(segments, day, structured))
+    if not_modified:
+        return not_modified
+    return await trip_day(db, segments, day, structured)
+
 router = APIRouter()
 
 class UserCreate(BaseModel):
@@ -151,23 +498,39 @@ def root():
     return {"message": "Welcome to the Trip Planner API!"}
 
 @app.post("/api/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = (await db.execute(select(User).where(User.email == user.email))).scalar_one_or_none()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_password = pwd_context.hash(user.password)
+    # bcrypt runs on the password process pool, not the event loop
+    hashed_password = await get_password_hasher().hash(user.password)
     new_user = User(name=user.name, email=user.email, password_hash=hashed_password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another registration for the same email got in first
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
     return {"message": "User registered successfully"}
 
 @app.post("/api/login")
-def login(login_req: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == login_req.email).first()
-    if not user or not pwd_context.verify(login_req.password, user.password_hash):
+async def login(login_req: LoginRequest, response: Response, db: AsyncSession = Depends(get_db)):
+    user = (await db.execute(select(User).where(User.email == login_req.email))).scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await get_password_hasher().verify_and_update(login_req.password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return {"message": "Logged in", "user_id": user.id, "name": user.name, "email": user.email}
+    if new_hash:
+        # Stored hash used a different bcrypt cost than BCRYPT_ROUNDS
+        user.password_hash = new_hash
+        await db.commit()
+    token = issue_token(user.id)
+    # Browsers keep the session in a cookie; other clients send the token as a Bearer header
+    response.set_cookie(SESSION_COOKIE, token, max_age=TOKEN_MAX_AGE, httponly=True, samesite="lax")
+    return {"message": "Logged in", "user_id": user.id, "name": user.name, "email": user.email,
+            "token": token, "token_type": "bearer"}
 
 app.include_router(router)
 
@@ -0,0 +1,287 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+
+# Prometheus text exposition format, written by hand so the hot path is a dict
+# update and the backend needs no extra dependency. Metrics are only updated
+# from the event loop, so there is no locking.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: cache hits and page loads at the low end, itinerary generation at the top
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in list(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        # Per label set: [count per bucket (+Inf last)], sum. Cumulative counts are built at scrape time.
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, (counts, total) in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class StatsCollector:
+    """Exposes an existing stats dict (e.g. ItineraryCache.stats) as a counter family, read at scrape time."""
+
+    def __init__(self, name: str, documentation: str, get_stats: Callable[[], Dict[str, float]], labelname: str):
+        self.name = name
+        self.documentation = documentation
+        self.get_stats = get_stats
+        self.labelname = labelname
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in self.get_stats().items():
+            lines.append(f"{self.name}{_format_labels((self.labelname,), (key,))} {_format_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                print(f"Metrics: failed to collect {metric.name}:", e)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time to produce a response, by route template.", ("route", "method", "status")
+))
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.register(Gauge(
+    "http_requests_in_progress", "Requests currently being handled.", ("route", "method")
+))
+LLM_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "llm_request_duration_seconds", "Chat completion latency, including retries.", ("model", "call")
+))
+LLM_REQUESTS_IN_PROGRESS = REGISTRY.register(Gauge(
+    "llm_requests_in_progress", "Chat completions currently in flight upstream.", ("model",)
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "llm_tokens_total", "Tokens reported by the API, by model and prompt/completion.", ("model", "type")
+))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "upstream_errors_total", "Failed calls to external services, by exception type.", ("service", "error")
+))
+WEATHER_REQUESTS = REGISTRY.register(Counter(
+    "weather_requests_total", "Weather lookups by how they were served (fresh, stale or fetched).", ("result",)
+))
+WEATHER_UPSTREAM_REQUESTS = REGISTRY.register(Counter(
+    "weather_upstream_requests_total", "Calls to the weather API, by HTTP status.", ("status",)
+))
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+class LLMCallMetrics:
+    """
+    Times one completion and records its tokens and errors:
+
+        with LLMCallMetrics(model, "create") as call:
+            response = await ...
+            call.record_usage(response.usage)
+    """
+
+    __slots__ = ("model", "call", "start")
+
+    def __init__(self, model: str, call: str):
+        self.model = model
+        self.call = call
+
+    def __enter__(self):
+        LLM_REQUESTS_IN_PROGRESS.inc(self.model)
+        self.start = time.perf_counter()
+        return self
+
+    def record_usage(self, usage):
+        if usage is not None:
+            LLM_TOKENS.inc(self.model, "prompt", amount=usage.prompt_tokens or 0)
+            LLM_TOKENS.inc(self.model, "completion", amount=usage.completion_tokens or 0)
+
+    def __exit__(self, exc_type, exc, tb):
+        LLM_REQUEST_DURATION.observe(time.perf_counter() - self.start, self.model, self.call)
+        LLM_REQUESTS_IN_PROGRESS.dec(self.model)
+        # Cancellation (a client going away) isn't an upstream failure
+        if exc_type is not None and issubclass(exc_type, Exception):
+            UPSTREAM_ERRORS.inc("openai", exc_type.__name__)
+        return False
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    APIRoute that records latency and in-flight requests per route template
+    (e.g. /weather/{city}), so metrics stay bounded however many cities or trip
+    ids are requested. Set as app.router.route_class before adding routes.
+    Streaming responses are timed until their headers are ready.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def instrumented_handler(request):
+            method = request.method
+            HTTP_REQUESTS_IN_PROGRESS.inc(route, method)
+            start = time.perf_counter()
+            status = "500"
+            try:
+                response = await handler(request)
+                status = str(response.status_code)
+                return response
+            except HTTPException as e:
+                status = str(e.status_code)
+                raise
+            except RequestValidationError:
+                status = "422"
+                raise
+            finally:
+                HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, route, method, status)
+                HTTP_REQUESTS_IN_PROGRESS.dec(route, method)
+
+        return instrumented_handler
+
+
+# Overhead benchmark: python metrics.py [requests]
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    import httpx
+    from fastapi import FastAPI
+
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    runs = 1_000_000
+    start = time.perf_counter()
+    for _ in range(runs):
+        HTTP_REQUEST_DURATION.observe(0.042, "/bench", "GET", "200")
+    print(f"Histogram.observe: {(time.perf_counter() - start) / runs * 1e9:.0f} ns")
+    start = time.perf_counter()
+    for _ in range(runs):
+        LLM_TOKENS.inc("gpt-3.5-turbo", "prompt", amount=120)
+    print(f"Counter.inc: {(time.perf_counter() - start) / runs * 1e9:.0f} ns")
+
+    def make_app(instrumented: bool) -> FastAPI:
+        app = FastAPI()
+        if instrumented:
+            app.router.route_class = InstrumentedRoute
+
+        @app.get("/weather/{city}")
+        async def weather(city: str):
+            return {"city": city, "temperature": 21.5, "description": "clear sky"}
+
+        return app
+
+    async def bench(app: FastAPI) -> float:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for i in range(200):
+                await client.get(f"/weather/city{i}")
+            start = time.perf_counter()
+            for i in range(total):
+                await client.get(f"/weather/city{i}")
+            return (time.perf_counter() - start) / total * 1e6
+
+    async def main():
+        # Alternate to even out warm-up and noise
+        plain, instrumented = [], []
+        for _ in range(3):
+            plain.append(await bench(make_app(False)))
+            instrumented.append(await bench(make_app(True)))
+        p, i = min(plain), min(instrumented)
+        print(f"{total:,} requests: plain {p:.1f} us, instrumented {i:.1f} us per request "
+              f"(+{i - p:.1f} us, {(i - p) / p * 100:+.1f}%)")
+        scrape_start = time.perf_counter()
+        body = render_metrics()
+        print(f"/metrics render: {(time.perf_counter() - scrape_start) * 1000:.2f} ms, {len(body):,} bytes")
+
+    asyncio.run(main())
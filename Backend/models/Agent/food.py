@@ -1,18 +1,23 @@
+import asyncio
 import openai
 import os
 from dotenv import load_dotenv
+import aiosqlite
 from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.types import Command, interrupt
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from typing import TypedDict, List, Dict, Any
+from typing import TypedDict, List, Dict, Any, Optional
 import json
+from llm_client import FINE_TUNED_MODEL, complete
+from models.Agent.itinerary_parser import parse_itinerary, split_day_blocks
+from models.catalog.retrieval import reference_itineraries
 
 # Load environment variables
 load_dotenv()
 
-# Set OpenAI API key
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
 # --- Define State Schema ---
 class TripPlannerState(TypedDict):
     destination: str
@@ -27,10 +32,20 @@ class TripPlannerState(TypedDict):
     user_feedback: str
     feedback_count: int
     is_approved: bool
+    # Days (1-based) the user rejected, and optionally which sections of them
+    rejected_days: List[int]
+    rejected_sections: Dict[str, List[str]]
+    feedback_comment: str
 
 # --- Step 1: Collect user input ---
 def collect_preferences(state: TripPlannerState) -> TripPlannerState:
     try:
+        state["feedback_count"] = 0
+        state["is_approved"] = False
+        # Preferences already supplied (e.g. from the API) - nothing to ask
+        if state.get("destination"):
+            return state
+
         print("\n🧳 Let's plan your trip!")
         state["destination"] = input("Enter destination (e.g., Paris): ").lower()
         state["budget"] = int(input("Enter budget (in USD): "))
@@ -40,15 +55,25 @@ def collect_preferences(state: TripPlannerState) -> TripPlannerState:
         state["transport"] = input("Enter preferred transport (Train/Car/Flight): ")
         state["requirement"] = input("Enter travel style/requirements: ")
         state["child"] = input("Traveling with children? (yes/no): ").lower() == "yes"
-        state["feedback_count"] = 0
-        state["is_approved"] = False
         return state
     except ValueError as e:
         print(f"⚠️ Error in input: {str(e)}")
         raise
 
+def structure_itinerary(state: TripPlannerState, reply: str) -> Dict[str, Any]:
+    """Structure the response for frontend display."""
+    return {
+        "title": f"{state['days']}-Day Itinerary for {state['destination']}",
+        "dates": f"{state['startDate']} - {state['endDate']}",
+        "budget": f"${state['budget']}",
+        "travelStyle": state['requirement'],
+        "withChildren": state.get('child', False),
+        "rawItinerary": reply,
+        "formattedItinerary": parse_itinerary(reply)
+    }
+
 # --- Step 2: Generate itinerary using GPT ---
-def generate_itinerary(state: TripPlannerState) -> TripPlannerState:
+async def generate_itinerary(state: TripPlannerState) -> TripPlannerState:
     """Generate itinerary using OpenAI API."""
     try:
         prompt = f"""
@@ -105,8 +130,11 @@ Please structure the response in the following format:
 - [Important tip 1]
 - [Important tip 2]
 """
-        response = openai.ChatCompletion.create(
-            model="ft:gpt-4o-mini-2024-07-18:personal:ai-trip-planner-final:BTKhoUKU",
+        references = reference_itineraries(state['destination'], state.get('requirement') or "")
+        if references:
+            prompt += "\n" + references + "\n"
+        reply = await complete(
+            model=FINE_TUNED_MODEL,
             messages=[
                 {"role": "system", "content": "You are an AI travel assistant specializing in creating detailed, personalized travel itineraries. Always follow the exact format provided in the prompt."},
                 {"role": "user", "content": prompt}
@@ -115,90 +143,96 @@ Please structure the response in the following format:
             temperature=0.7
         )
         
-        reply = response.choices[0].message["content"].strip()
-        
-        # Structure the response for frontend display
-        structured_response = {
-            "title": f"{state['days']}-Day Itinerary for {state['destination']}",
-            "dates": f"{state['startDate']} - {state['endDate']}",
-            "budget": f"${state['budget']}",
-            "travelStyle": state['requirement'],
-            "withChildren": state.get('child', False),
-            "rawItinerary": reply,
-            "formattedItinerary": {
-                "days": [],
-                "costBreakdown": {},
-                "specialConsiderations": []
-            }
-        }
-        
-        # Parse the raw itinerary into structured format
-        current_day = None
-        current_section = None
-        
-        for line in reply.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-                
-            if line.startswith('### Day'):
-                current_day = {
-                    "day": line.replace('### ', ''),
-                    "sections": {
-                        "morning": [],
-                        "afternoon": [],
-                        "evening": []
-                    }
-                }
-                structured_response["formattedItinerary"]["days"].append(current_day)
-            elif line.startswith('####'):
-                current_section = line.replace('#### ', '').lower()
-            elif line.startswith('- **'):
-                if current_day and current_section:
-                    activity = {
-                        "time": line.split('**: ')[0].replace('- **', ''),
-                        "description": line.split('**: ')[1],
-                        "details": []
-                    }
-                    current_day["sections"][current_section].append(activity)
-            elif line.startswith('  - **'):
-                if current_day and current_section and current_day["sections"][current_section]:
-                    detail = line.replace('  - **', '').split('**: ')
-                    current_day["sections"][current_section][-1]["details"].append({
-                        "type": detail[0],
-                        "value": detail[1]
-                    })
-            elif line.startswith('### Overall Cost Breakdown'):
-                current_section = "costBreakdown"
-            elif line.startswith('### Special Considerations'):
-                current_section = "specialConsiderations"
-            elif current_section == "costBreakdown" and line.startswith('- **'):
-                cost_item = line.replace('- **', '').split('**: ')
-                structured_response["formattedItinerary"]["costBreakdown"][cost_item[0]] = cost_item[1]
-            elif current_section == "specialConsiderations" and line.startswith('- '):
-                structured_response["formattedItinerary"]["specialConsiderations"].append(line.replace('- ', ''))
-        
-        state["itinerary"] = structured_response
+        state["itinerary"] = structure_itinerary(state, reply)
         return state
         
-    except openai.error.AuthenticationError:
+    except openai.AuthenticationError:
         raise ValueError("OpenAI API authentication failed. Please check your API key.")
-    except openai.error.RateLimitError:
+    except openai.RateLimitError:
         raise ValueError("OpenAI API rate limit exceeded. Please try again later.")
     except Exception as e:
         raise ValueError(f"Failed to generate itinerary: {str(e)}")
 
 # --- Step 3: Show itinerary & ask feedback ---
 def ask_feedback(state: TripPlannerState) -> TripPlannerState:
+    """
+    Pause the graph until feedback arrives.
+
+    The graph is checkpointed here; resume it with Command(resume=feedback) where
+    feedback is "yes"/"no" or {"approved": bool, "rejected_days": [2, 4],
+    "rejected_sections": {"2": ["evening"]}, "comment": "..."}.
+    """
+    # Outside the try: interrupt() pauses the graph by raising GraphInterrupt
+    feedback = interrupt({"itinerary": state["itinerary"], "feedback_count": state["feedback_count"]})
     try:
-        print("\n📅 Here's your suggested itinerary:")
-        print(json.dumps(state["itinerary"], indent=2))
-        state["user_feedback"] = input("Do you like this itinerary? (yes/no): ").strip().lower()
+        if isinstance(feedback, str):
+            feedback = {"approved": feedback.strip().lower() == "yes"}
+
+        sections = {
+            str(day): [name.lower() for name in names]
+            for day, names in (feedback.get("rejected_sections") or {}).items()
+        }
+        days = {int(day) for day in feedback.get("rejected_days") or []} | {int(day) for day in sections}
+        state["user_feedback"] = "yes" if feedback.get("approved") else "no"
+        state["rejected_days"] = sorted(days)
+        state["rejected_sections"] = sections
+        state["feedback_comment"] = feedback.get("comment") or ""
         return state
     except Exception as e:
-        print(f"⚠️ Error displaying itinerary: {str(e)}")
+        print(f"⚠️ Error reading feedback: {str(e)}")
         raise
 
+# --- Step 3b: Rewrite only the rejected days ---
+async def regenerate_days(state: TripPlannerState) -> TripPlannerState:
+    """Regenerate the rejected days with the rest of the plan as context, then splice them back in."""
+    try:
+        raw = state["itinerary"]["rawItinerary"]
+        preamble, days, rest = split_day_blocks(raw)
+        targets = [day for day in state["rejected_days"] if 1 <= day <= len(days)]
+        if not targets:
+            return await generate_itinerary(state)
+
+        async def rewrite(day: int) -> str:
+            sections = state["rejected_sections"].get(str(day))
+            scope = (
+                f"Rewrite only the {', '.join(sections)} section(s) of Day {day}; keep its other sections unchanged."
+                if sections else f"Rewrite Day {day} completely with different activities."
+            )
+            comment = f"\nTraveller feedback: {state['feedback_comment']}" if state.get("feedback_comment") else ""
+            prompt = f"""
+Here is the current itinerary for a {state['days']}-day trip to {state['destination']} (budget ${state['budget']}, travel style: {state['requirement']}, travelling with children: {'Yes' if state.get('child') else 'No'}):
+
+{raw}
+
+The traveller rejected Day {day}. {scope}{comment}
+Avoid repeating activities from the other days.
+Return only the new Day {day} block, starting with its "### Day {day}:" heading and using the same
+#### Morning / #### Afternoon / #### Evening and "- **[Time]**: [Activity]" format as above.
+"""
+            return await complete(
+                model=FINE_TUNED_MODEL,
+                messages=[
+                    {"role": "system", "content": "You are an AI travel assistant specializing in creating detailed, personalized travel itineraries. Always follow the exact format provided in the prompt."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=700,
+                temperature=0.7
+            )
+
+        for day, block in zip(targets, await asyncio.gather(*(rewrite(day) for day in targets))):
+            days[day - 1] = block.strip()
+
+        reply = "\n\n".join(part for part in [preamble, *days, rest] if part)
+        state["itinerary"] = structure_itinerary(state, reply)
+        return state
+
+    except openai.AuthenticationError:
+        raise ValueError("OpenAI API authentication failed. Please check your API key.")
+    except openai.RateLimitError:
+        raise ValueError("OpenAI API rate limit exceeded. Please try again later.")
+    except Exception as e:
+        raise ValueError(f"Failed to regenerate itinerary: {str(e)}")
+
 # --- Step 4: Update state based on feedback ---
 def update_feedback_state(state: TripPlannerState) -> TripPlannerState:
     try:
@@ -219,6 +253,8 @@ def itinerary_decision(state: TripPlannerState) -> str:
         elif state["feedback_count"] >= 2:
             print("❌ Too many rejections. Finalizing last itinerary.")
             return END
+        elif state.get("rejected_days"):
+            return "regenerate"
         else:
             return "generate"
     except Exception as e:
@@ -232,28 +268,101 @@ try:
     graph.add_node("generate", generate_itinerary)
     graph.add_node("feedback", ask_feedback)
     graph.add_node("update", update_feedback_state)
+    graph.add_node("regenerate", regenerate_days)
 
     graph.set_entry_point("collect")
     graph.add_edge("collect", "generate")
     graph.add_edge("generate", "feedback")
     graph.add_edge("feedback", "update")
+    graph.add_edge("regenerate", "feedback")
 
     graph.add_conditional_edges(
         "update",
         itinerary_decision,
         {
             END: END,
-            "generate": "generate"
+            "generate": "generate",
+            "regenerate": "regenerate"
         }
     )
 
     # --- Compile the graph ---
-    app = graph.compile()
+    # In-process checkpoints are enough for the CLI; the API uses get_planner()
+    app = graph.compile(checkpointer=MemorySaver())
 except Exception as e:
     print(f"⚠️ Error building graph: {str(e)}")
     raise
 
-# --- Step 7: Run the App ---
+# --- Step 7: Resumable planning sessions backed by SQLite ---
+CHECKPOINT_PATH = os.getenv("PLANNER_CHECKPOINT_PATH", "./planner_checkpoints.db")
+_planner = None
+_planner_conn: Optional[aiosqlite.Connection] = None
+
+async def get_planner():
+    """Graph compiled with a SQLite checkpointer, so sessions survive across requests and restarts."""
+    global _planner, _planner_conn
+    if _planner is None:
+        _planner_conn = await aiosqlite.connect(CHECKPOINT_PATH)
+        _planner = graph.compile(checkpointer=AsyncSqliteSaver(_planner_conn))
+    return _planner
+
+async def close_planner():
+    global _planner, _planner_conn
+    if _planner_conn is not None:
+        await _planner_conn.close()
+    _planner, _planner_conn = None, None
+
+async def planner_status(planner, thread_id: str) -> Optional[Dict[str, Any]]:
+    snapshot = await planner.aget_state({"configurable": {"thread_id": thread_id}})
+    if not snapshot.values:
+        return None
+    return {
+        "thread_id": thread_id,
+        "awaiting_feedback": bool(snapshot.next),
+        "feedback_count": snapshot.values.get("feedback_count", 0),
+        "is_approved": snapshot.values.get("is_approved", False),
+        "itinerary": snapshot.values.get("itinerary"),
+    }
+
+async def start_planning(thread_id: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate the first itinerary for a session and stop at the feedback step."""
+    planner = await get_planner()
+    initial_state = {
+        "itinerary": {},
+        "user_feedback": "",
+        "rejected_days": [],
+        "rejected_sections": {},
+        "feedback_comment": "",
+        **preferences,
+    }
+    await planner.ainvoke(initial_state, {"configurable": {"thread_id": thread_id}})
+    return await planner_status(planner, thread_id)
+
+async def submit_feedback(thread_id: str, feedback: Dict[str, Any]) -> Dict[str, Any]:
+    """Resume a paused session with feedback; runs until the next feedback step or the end."""
+    planner = await get_planner()
+    await planner.ainvoke(Command(resume=feedback), {"configurable": {"thread_id": thread_id}})
+    return await planner_status(planner, thread_id)
+
+async def get_planning(thread_id: str) -> Optional[Dict[str, Any]]:
+    return await planner_status(await get_planner(), thread_id)
+
+# --- Step 8: Run the App ---
+async def run_cli(initial_state: Dict[str, Any]) -> Dict[str, Any]:
+    config = {"configurable": {"thread_id": "cli"}}
+    final_state = await app.ainvoke(initial_state, config)
+    while (await app.aget_state(config)).next:
+        print("\n📅 Here's your suggested itinerary:")
+        print(json.dumps(final_state["itinerary"], indent=2))
+        answer = input("Do you like this itinerary? (yes/no): ").strip().lower()
+        feedback = {"approved": answer == "yes"}
+        if answer != "yes":
+            days = input("Which days should change? (e.g. 2,4 - blank for all): ").strip()
+            feedback["rejected_days"] = [int(day) for day in days.replace(",", " ").split()]
+            feedback["comment"] = input("Anything specific? ").strip()
+        final_state = await app.ainvoke(Command(resume=feedback), config)
+    return final_state
+
 if __name__ == "__main__":
     try:
         initial_state = {
@@ -268,10 +377,13 @@ if __name__ == "__main__":
             "itinerary": {},
             "user_feedback": "",
             "feedback_count": 0,
-            "is_approved": False
+            "is_approved": False,
+            "rejected_days": [],
+            "rejected_sections": {},
+            "feedback_comment": ""
         }
 
-        final_state = app.invoke(initial_state)
+        final_state = asyncio.run(run_cli(initial_state))
 
         print("\n✅ Final Approved Itinerary:")
         print(json.dumps(final_state["itinerary"], indent=2))
@@ -1,11 +1,14 @@
-import openai
+import asyncio
 import os
+import re
+from datetime import date, timedelta
 from dotenv import load_dotenv
-from typing import Dict, Optional, TypedDict
+from typing import Dict, List, Optional, TypedDict
 from langgraph.graph import StateGraph, END
+from llm_client import FINE_TUNED_MODEL, complete
+from models.catalog.retrieval import reference_itineraries
 
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
 class ItineraryState(TypedDict, total=False):
     destination: str
@@ -17,8 +20,13 @@ class ItineraryState(TypedDict, total=False):
     requirement: str
     child: Optional[bool]
     prompt: Optional[str]
+    # Matching days from the scraped catalog, "" when there are none
+    references: Optional[str]
     itinerary: Optional[str]
     error: Optional[str]
+    # None picks per-day fan-out automatically for trips of FANOUT_MIN_DAYS or more
+    fanout: Optional[bool]
+    outline: Optional[List[str]]
 
 def validate_input(state: ItineraryState) -> ItineraryState:
     required_fields = ['destination', 'budget', 'days', 'startDate', 'endDate', 'transport', 'requirement']
@@ -46,13 +54,16 @@ Please include:
 5. Dining recommendations
 6. Any special considerations based on the travel style and children status
 """
+    state["references"] = reference_itineraries(state["destination"], state.get("requirement") or "")
+    if state["references"]:
+        prompt += "\n" + state["references"] + "\n"
     state["prompt"] = prompt
     return state
 
-def call_openai(state: ItineraryState) -> ItineraryState:
+async def call_openai(state: ItineraryState) -> ItineraryState:
     
-        response = openai.ChatCompletion.create(
-            model="ft:gpt-4o-mini-2024-07-18:personal:ai-trip-planner-final:BTKhoUKU",
+        state["itinerary"] = await complete(
+            model=FINE_TUNED_MODEL,
             messages=[
                 {"role": "system", "content": "You are an AI travel assistant specializing in creating detailed, personalized travel itineraries."},
                 {"role": "user", "content": state["prompt"]}
@@ -60,10 +71,102 @@ def call_openai(state: ItineraryState) -> ItineraryState:
             max_tokens=2000,
             temperature=0.7
         )
-        state["itinerary"] = response.choices[0].message["content"].strip()
         return state
     
 
+# --- Fan-out mode for long trips ---
+# A cheap outline fixes each day's theme, then every day is written concurrently,
+# so latency tracks the slowest day instead of one long (often truncated) reply.
+FANOUT_MIN_DAYS = int(os.getenv("FANOUT_MIN_DAYS", "7"))
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "4"))
+OUTLINE_LINE = re.compile(r"^\W*Day\s*(\d+)\W*\s*(.*)$", re.IGNORECASE)
+
+SYSTEM_PROMPT = "You are an AI travel assistant specializing in creating detailed, personalized travel itineraries."
+
+def choose_generation(state: ItineraryState) -> str:
+    if "error" in state:
+        return "return_result"
+    fanout = state.get("fanout")
+    if fanout is None:
+        fanout = int(state["days"]) >= FANOUT_MIN_DAYS
+    return "outline" if fanout else "call_openai"
+
+def trip_summary(state: ItineraryState) -> str:
+    return (
+        f"{state['days']}-day trip to {state['destination']} ({state['startDate']} to {state['endDate']}), "
+        f"budget ${state['budget']}, travelling by {state['transport']}, style: {state['requirement']}, "
+        f"children: {'Yes' if state.get('child') else 'No'}."
+    )
+
+def day_date(state: ItineraryState, index: int) -> str:
+    try:
+        return (date.fromisoformat(state["startDate"]) + timedelta(days=index)).isoformat()
+    except ValueError:
+        return ""
+
+async def create_outline(state: ItineraryState) -> ItineraryState:
+    days = int(state["days"])
+    references = f"{state['references']}\n" if state.get("references") else ""
+    reply = await complete(
+        model=FINE_TUNED_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": (
+                f"Outline a {trip_summary(state)}\n"
+                f"{references}"
+                f"Reply with exactly {days} lines, one per day, formatted as "
+                "'Day N: <area or theme> - <2-3 key activities>'. No other text."
+            )}
+        ],
+        max_tokens=40 * days,
+        temperature=0.7
+    )
+    outline = [""] * days
+    for line in reply.splitlines():
+        match = OUTLINE_LINE.match(line.strip())
+        if match and 1 <= int(match.group(1)) <= days:
+            outline[int(match.group(1)) - 1] = match.group(2).strip()
+    state["outline"] = [item or "Free exploration and local sightseeing" for item in outline]
+    return state
+
+async def expand_days(state: ItineraryState) -> ItineraryState:
+    semaphore = asyncio.Semaphore(FANOUT_CONCURRENCY)
+    plan = "\n".join(f"Day {i + 1}: {item}" for i, item in enumerate(state["outline"]))
+
+    async def write(prompt: str, max_tokens: int) -> str:
+        async with semaphore:
+            return await complete(
+                model=FINE_TUNED_MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=0.7
+            )
+
+    def day_prompt(index: int) -> str:
+        when = day_date(state, index)
+        return (
+            f"Trip: {trip_summary(state)}\nFull plan:\n{plan}\n\n"
+            f"Write only Day {index + 1}{f' ({when})' if when else ''}: {state['outline'][index]}.\n"
+            f"Start with the heading '### Day {index + 1}: <title>' and include timings, attractions, "
+            "estimated costs, transportation between locations and dining recommendations."
+        )
+
+    summary_prompt = (
+        f"Trip: {trip_summary(state)}\nFull plan:\n{plan}\n\n"
+        "Write only two sections for this plan: '### Overall Cost Breakdown' with estimated totals, and "
+        "'### Special Considerations' based on the travel style and children status."
+    )
+
+    parts = await asyncio.gather(
+        *(write(day_prompt(i), 600) for i in range(len(state["outline"]))),
+        write(summary_prompt, 400),
+    )
+    state["itinerary"] = "\n\n".join(part.strip() for part in parts)
+    return state
+
 def return_result(state: ItineraryState) -> Dict:
     if "error" in state:
         return {"error": state["error"]}
@@ -74,18 +177,26 @@ graph = StateGraph(state_schema=ItineraryState)
 graph.add_node("validate", validate_input)
 graph.add_node("create_prompt", create_prompt)
 graph.add_node("call_openai", call_openai)
+graph.add_node("outline", create_outline)
+graph.add_node("expand_days", expand_days)
 graph.add_node("return_result", return_result)
 
 graph.set_entry_point("validate")
 graph.add_edge("validate", "create_prompt")
-graph.add_edge("create_prompt", "call_openai")
+graph.add_conditional_edges(
+    "create_prompt",
+    choose_generation,
+    {"call_openai": "call_openai", "outline": "outline", "return_result": "return_result"}
+)
 graph.add_edge("call_openai", "return_result")
+graph.add_edge("outline", "expand_days")
+graph.add_edge("expand_days", "return_result")
 graph.add_edge("return_result", END)
 
 graph = graph.compile()
 
 if __name__ == "__main__":
-    result = graph.invoke({
+    result = asyncio.run(graph.ainvoke({
         "destination": "Manali",
         "budget": 25000,
         "days": 4,
@@ -94,6 +205,6 @@ if __name__ == "__main__":
         "transport": "Train",
         "requirement": "Include adventure sports and nature spots",
         "child": False
-    })
+    }))
     print(result)
     
\ No newline at end of file
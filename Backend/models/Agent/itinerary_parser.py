@@ -0,0 +1,241 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# "- **6:00 AM**: Depart ..." / "- **Cost:** ₹500" / "- plain bullet"
+BULLET_RE = re.compile(r"^[-*]\s+(?:\*\*(.+?)\*\*\s*:?\s*(.*)|(.*))$")
+DATE_RE = re.compile(r"^\*\*Date:?\*\*:?\s*(.+?)\s*$|^\*\*Date:\s*(.+?)\*\*$", re.IGNORECASE)
+DEFAULT_SECTIONS = ("morning", "afternoon", "evening")
+# "### Day 3: Old Town" or "### Day3: ..." -- and not a title like "# Day-by-Day Itinerary for Goa"
+DAY_HEADING_RE = re.compile(r"^#{1,3}\s*Day\s*\d+\b", re.IGNORECASE)
+
+
+def is_day_heading(line: str) -> bool:
+    return DAY_HEADING_RE.match(line.strip()) is not None
+
+
+def _split_bullet(text: str):
+    match = BULLET_RE.match(text)
+    if not match:
+        return "", text
+    if match.group(1) is not None:
+        label = match.group(1).strip().rstrip(":").strip()
+        return label, match.group(2).strip()
+    return "", match.group(3).strip()
+
+
+class ItineraryParser:
+    """
+    Incremental parser for the markdown itinerary format the models produce.
+
+    Text can be fed in arbitrary chunks as it streams in; every complete line is
+    parsed immediately and turned into events:
+
+        {"type": "day", "index": 0, "day": "Day 1: Arrival"}
+        {"type": "date", "index": 0, "date": "2025-05-28"}
+        {"type": "section", "index": 0, "section": "morning"}
+        {"type": "activity", "index": 0, "section": "morning", "activity": {...}}
+        {"type": "detail", "index": 0, "section": "morning", "detail": {...}}
+        {"type": "cost", "item": "Accommodation", "value": "₹6000"}
+        {"type": "consideration", "text": "Carry cash"}
+
+    The accumulated result has the same shape as food.py's `formattedItinerary`.
+    Lines that don't fit the format are skipped rather than raising.
+    """
+
+    def __init__(self):
+        self.result: Dict = {"days": [], "costBreakdown": {}, "specialConsiderations": []}
+        self._buffer = ""
+        self._day: Optional[Dict] = None
+        self._section: Optional[str] = None
+        # None (inside a day or preamble), "costBreakdown" or "specialConsiderations"
+        self._block: Optional[str] = None
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume a chunk of text and return events for the lines it completed."""
+        self._buffer += chunk
+        if "\n" not in self._buffer:
+            return []
+        *lines, self._buffer = self._buffer.split("\n")
+        events: List[Dict] = []
+        for line in lines:
+            self._parse_line(line, events)
+        return events
+
+    def close(self) -> List[Dict]:
+        """Parse whatever is left in the buffer (the final unterminated line)."""
+        events: List[Dict] = []
+        if self._buffer:
+            self._parse_line(self._buffer, events)
+            self._buffer = ""
+        return events
+
+    def _parse_line(self, raw: str, events: List[Dict]):
+        line = raw.strip()
+        if not line:
+            return
+        indent = len(raw) - len(raw.lstrip(" \t"))
+
+        if line.startswith("####"):
+            if self._day is not None:
+                self._section = line.lstrip("#").strip().rstrip(":").strip().lower()
+                self._day["sections"].setdefault(self._section, [])
+                events.append({"type": "section", "index": len(self.result["days"]) - 1, "section": self._section})
+            return
+
+        if line.startswith("#"):
+            heading = line.lstrip("#").strip()
+            lowered = heading.lower()
+            if is_day_heading(line):
+                self._day = {"day": heading, "sections": {name: [] for name in DEFAULT_SECTIONS}}
+                self._section = None
+                self._block = None
+                self.result["days"].append(self._day)
+                events.append({"type": "day", "index": len(self.result["days"]) - 1, "day": heading})
+            elif "cost" in lowered:
+                self._block = "costBreakdown"
+                self._day = None
+            elif "special" in lowered or "consideration" in lowered or "tips" in lowered:
+                self._block = "specialConsiderations"
+                self._day = None
+            else:
+                self._block = None
+                self._day = None
+            return
+
+        if self._block == "costBreakdown":
+            if line[0] in "-*" and len(line) > 1 and line[1] == " ":
+                item, value = _split_bullet(line)
+                if item:
+                    self.result["costBreakdown"][item] = value
+                    events.append({"type": "cost", "item": item, "value": value})
+            return
+
+        if self._block == "specialConsiderations":
+            if line[0] in "-*" and len(line) > 1 and line[1] == " ":
+                text = line[2:].strip()
+                self.result["specialConsiderations"].append(text)
+                events.append({"type": "consideration", "text": text})
+            return
+
+        if self._day is None:
+            return
+
+        index = len(self.result["days"]) - 1
+        date = DATE_RE.match(line)
+        if date:
+            self._day["date"] = (date.group(1) or date.group(2)).strip()
+            events.append({"type": "date", "index": index, "date": self._day["date"]})
+            return
+
+        if not (line[0] in "-*" and len(line) > 1 and line[1] == " "):
+            return
+
+        # Bullets before any "#### Morning" heading still belong to the day
+        section = self._section or DEFAULT_SECTIONS[0]
+        activities = self._day["sections"].setdefault(section, [])
+        label, text = _split_bullet(line)
+
+        if indent >= 2 and activities:
+            detail = {"type": label, "value": text}
+            activities[-1]["details"].append(detail)
+            events.append({"type": "detail", "index": index, "section": section, "detail": detail})
+        else:
+            activity = {"time": label, "description": text, "details": []}
+            activities.append(activity)
+            events.append({"type": "activity", "index": index, "section": section, "activity": activity})
+
+
+def split_day_blocks(text: str) -> Tuple[str, List[str], str]:
+    """
+    Split raw itinerary markdown into (preamble, day blocks, rest).
+
+    Each day block starts with its "### Day N" heading; `rest` starts at the
+    first non-day heading after the days (cost breakdown, considerations, ...).
+    Joining the pieces with blank lines reproduces the itinerary.
+    """
+    preamble: List[str] = []
+    days: List[List[str]] = []
+    rest: List[str] = []
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if stripped.startswith("#") and not stripped.startswith("####") and not rest:
+            if is_day_heading(stripped):
+                days.append([line])
+                continue
+            if days:
+                rest.append(line)
+                continue
+        if rest:
+            rest.append(line)
+        elif days:
+            days[-1].append(line)
+        else:
+            preamble.append(line)
+    return (
+        "\n".join(preamble).strip(),
+        ["\n".join(block).strip() for block in days],
+        "\n".join(rest).strip(),
+    )
+
+
+def parse_itinerary(text: str) -> Dict:
+    """Parse a complete itinerary into {"days", "costBreakdown", "specialConsiderations"}."""
+    parser = ItineraryParser()
+    parser.feed(text)
+    parser.close()
+    return parser.result
+
+
+if __name__ == "__main__":
+    # Micro-benchmark: python -m models.Agent.itinerary_parser [corpus.txt] [copies]
+    import random
+    import sys
+    import time
+
+    def synthetic_itinerary(days: int) -> str:
+        lines = [f"**{days}-Day Itinerary for Manali**", ""]
+        for d in range(1, days + 1):
+            lines += [f"### Day {d}: Exploring", f"**Date:** 2025-06-{d:02d}", ""]
+            for section in ("Morning", "Afternoon", "Evening"):
+                lines.append(f"#### {section}")
+                for hour in (8, 10):
+                    lines += [
+                        f"- **{hour}:00 AM**: Visit attraction {d}-{hour}",
+                        "  - **Location**: Old Manali",
+                        "  - **Cost**: ₹500",
+                        "  - **Duration**: 2 hours",
+                        "  - malformed detail line without a label",
+                    ]
+                lines.append("")
+        lines += ["### Overall Cost Breakdown", "- **Accommodation**: ₹6000", "- **Total Estimated Cost**: ₹20000",
+                  "", "### Special Considerations", "- Carry warm clothes", "- Book paragliding early"]
+        return "\n".join(lines)
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            corpus = [f.read()]
+    else:
+        corpus = [synthetic_itinerary(random.randint(3, 10)) for _ in range(100)]
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    corpus = corpus * copies
+    total_bytes = sum(len(text.encode("utf-8")) for text in corpus)
+
+    start = time.perf_counter()
+    for text in corpus:
+        parse_itinerary(text)
+    whole = time.perf_counter() - start
+
+    start = time.perf_counter()
+    events = 0
+    for text in corpus:
+        parser = ItineraryParser()
+        # Feed in token-sized chunks, as a stream would deliver them
+        for i in range(0, len(text), 16):
+            events += len(parser.feed(text[i:i + 16]))
+        events += len(parser.close())
+    streamed = time.perf_counter() - start
+
+    mb = total_bytes / 1e6
+    print(f"{len(corpus)} itineraries, {mb:.1f} MB")
+    print(f"whole text : {len(corpus) / whole:,.0f} itineraries/s, {mb / whole:.1f} MB/s")
+    print(f"16-char feed: {len(corpus) / streamed:,.0f} itineraries/s, {mb / streamed:.1f} MB/s, {events:,} events")
@@ -0,0 +1,108 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+from bs4 import BeautifulSoup
+
+from tokens import count_tokens
+
+# Elements that never carry package content
+STRUCTURAL_TAGS = ("script", "style", "noscript", "nav", "header", "footer", "aside", "form", "iframe", "svg", "button")
+DAY_RE = re.compile(r"^Day\s*0?\d{1,2}\b", re.IGNORECASE)
+KEY_FACT_RE = re.compile(r"(₹|Rs\.?\s*\d|INR|\d+\s*Nights?|\d+\s*Days?|Highlights?|Inclusions?|Itinerary)", re.IGNORECASE)
+
+
+def page_blocks(soup: BeautifulSoup) -> List[Dict]:
+    """
+    Text blocks of a page with navigation, footers and scripts removed.
+
+    Each block is {"text", "kind"} where kind is "title" (the h1), "day" (a
+    "Day N" heading or text under it), "fact" (price/duration/highlights
+    lines) or "body". Note: removes the structural tags from `soup` in place.
+    """
+    for tag in soup.find_all(STRUCTURAL_TAGS):
+        tag.decompose()
+    title = soup.find("h1")
+    title_text = title.get_text(" ", strip=True) if title else ""
+
+    blocks = []
+    in_days = False
+    for line in soup.get_text(separator="\n", strip=True).split("\n"):
+        if line == title_text:
+            kind = "title"
+        elif DAY_RE.match(line):
+            kind, in_days = "day", True
+        elif in_days and len(line) > 40:
+            kind = "day"
+        else:
+            in_days = in_days and len(line) > 40
+            kind = "fact" if KEY_FACT_RE.search(line) else "body"
+        blocks.append({"text": line, "kind": kind})
+    return blocks
+
+
+class PageCondenser:
+    """
+    Shrinks tour pages before they are sent to the LLM.
+
+    Blocks that repeat across many pages of the site (menus, related-tour
+    lists, contact details) are learned as boilerplate and dropped. The rest is
+    trimmed to a token budget, keeping the title, day-by-day itinerary and key
+    facts first and filling any room left with other body text, in page order.
+    """
+
+    def __init__(self, min_pages: int = 3, min_share: float = 0.3):
+        self.min_pages = min_pages
+        self.min_share = min_share
+        self.pages_seen = 0
+        self._block_pages: Counter = Counter()
+
+    @staticmethod
+    def _fingerprint(text: str) -> str:
+        return hashlib.blake2b(" ".join(text.lower().split()).encode("utf-8"), digest_size=8).hexdigest()
+
+    def observe(self, blocks: List[Dict]):
+        """Count which blocks this page shares with the rest of the site."""
+        self.pages_seen += 1
+        self._block_pages.update({self._fingerprint(block["text"]) for block in blocks})
+
+    def is_boilerplate(self, block: Dict) -> bool:
+        if block["kind"] in ("title", "day") or self.pages_seen < self.min_pages:
+            return False
+        seen_on = self._block_pages[self._fingerprint(block["text"])]
+        return seen_on >= self.min_pages and seen_on / self.pages_seen >= self.min_share
+
+    def condense(self, blocks: List[Dict], token_budget: int = 1500) -> str:
+        kept = [(i, block) for i, block in enumerate(blocks) if not self.is_boilerplate(block)]
+        priority = {"title": 0, "day": 1, "fact": 1, "body": 2}
+        chosen = set()
+        used = 0
+        for i, block in sorted(kept, key=lambda item: (priority[item[1]["kind"]], item[0])):
+            tokens = count_tokens(block["text"]) + 1
+            if used + tokens > token_budget:
+                # A long block may not fit while shorter ones later still do
+                continue
+            chosen.add(i)
+            used += tokens
+        return "\n".join(blocks[i]["text"] for i in sorted(chosen))
+
+
+def pack_pages(items: Sequence[Tuple[Hashable, str]], token_budget: int, max_pages: int = 8) -> List[List[Hashable]]:
+    """
+    Group condensed pages into batches for single extraction calls.
+
+    First-fit decreasing by token count, so each batch's combined text stays
+    within `token_budget` and holds at most `max_pages` pages. A page larger
+    than the budget gets a batch of its own.
+    """
+    sized = sorted(((count_tokens(text), key) for key, text in items), key=lambda item: -item[0])
+    batches: List[Tuple[int, List[Hashable]]] = []
+    for tokens, key in sized:
+        for index, (used, keys) in enumerate(batches):
+            if used + tokens <= token_budget and len(keys) < max_pages:
+                batches[index] = (used + tokens, keys + [key])
+                break
+        else:
+            batches.append((tokens, [key]))
+    return [keys for _, keys in batches]
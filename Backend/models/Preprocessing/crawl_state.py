@@ -0,0 +1,118 @@
+import hashlib
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CrawlState:
+    """
+    Per-URL crawl state in SQLite, so catalog refreshes are incremental.
+
+    For every page it keeps the validators from the last response (ETag and
+    Last-Modified) for conditional GETs, a hash of the extracted text, and the
+    last LLM output. Each page is committed as soon as it is processed, and a
+    run that didn't finish is resumed on the next start: pages already checked
+    during that run are skipped.
+    """
+
+    def __init__(self, path: str = "./crawl_state.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                output TEXT,
+                checked_at REAL,
+                changed_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            );
+            """
+        )
+        self._conn.commit()
+        self.run_started_at = self._start_run()
+
+    def _start_run(self) -> float:
+        row = self._conn.execute("SELECT started_at FROM runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1").fetchone()
+        if row is not None:
+            print("Resuming unfinished crawl run.")
+            return row["started_at"]
+        now = time.time()
+        self._conn.execute("INSERT INTO runs (started_at) VALUES (?)", (now,))
+        self._conn.commit()
+        return now
+
+    def finish_run(self):
+        self._conn.execute("UPDATE runs SET finished_at = ? WHERE finished_at IS NULL", (time.time(),))
+        self._conn.commit()
+
+    def track(self, urls: List[str]):
+        """Register listing URLs in order; new pages get a row, known ones keep their state."""
+        self._conn.executemany(
+            "INSERT INTO pages (url, position) VALUES (?, ?) ON CONFLICT(url) DO UPDATE SET position = excluded.position",
+            [(url, position) for position, url in enumerate(urls)],
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[Dict]:
+        row = self._conn.execute("SELECT * FROM pages WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def checked_this_run(self, url: str) -> bool:
+        page = self.get(url)
+        return bool(page and page["checked_at"] and page["checked_at"] >= self.run_started_at)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        page = self.get(url)
+        headers = {}
+        # Without a stored output there is nothing to fall back on for a 304
+        if page and page["output"]:
+            if page["etag"]:
+                headers["If-None-Match"] = page["etag"]
+            if page["last_modified"]:
+                headers["If-Modified-Since"] = page["last_modified"]
+        return headers
+
+    def mark_unchanged(self, url: str):
+        self._conn.execute("UPDATE pages SET checked_at = ? WHERE url = ?", (time.time(), url))
+        self._conn.commit()
+
+    def save(self, url: str, etag: Optional[str], last_modified: Optional[str], text_hash: str, output: Optional[str]):
+        """Checkpoint a fetched page; `output` None means the text was unchanged and the old output stands."""
+        now = time.time()
+        if output is None:
+            self._conn.execute(
+                "UPDATE pages SET etag = ?, last_modified = ?, checked_at = ? WHERE url = ?",
+                (etag, last_modified, now, url),
+            )
+        else:
+            self._conn.execute(
+                "UPDATE pages SET etag = ?, last_modified = ?, content_hash = ?, output = ?, checked_at = ?, "
+                "changed_at = ? WHERE url = ?",
+                (etag, last_modified, text_hash, output, now, now, url),
+            )
+        self._conn.commit()
+
+    def outputs(self) -> List[Dict]:
+        """(url, output) for every page that has been extracted, in listing order."""
+        rows = self._conn.execute(
+            "SELECT url, output FROM pages WHERE output IS NOT NULL ORDER BY position"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urldefrag, urlsplit
+
+import httpx
+
+# process(url, response) may return further URLs to crawl
+Processor = Callable[[str, httpx.Response], Awaitable[Optional[Iterable[str]]]]
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def normalize_url(url: str) -> str:
+    """Drop fragments so the frontier doesn't visit the same page twice."""
+    return urldefrag(url)[0]
+
+
+class Crawler:
+    """
+    Async crawler with a bounded worker pool.
+
+    Requests share one keep-alive httpx client and are paced per host by a
+    token bucket instead of a fixed sleep after every page. The frontier dedupes
+    URLs with a set, so adding a link is O(1) however large the crawl gets.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        per_host_rate: float = 1.0,
+        per_host_burst: float = 2,
+        timeout: float = 20.0,
+        retries: int = 2,
+        headers: Optional[Dict[str, str]] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.concurrency = concurrency
+        self.per_host_rate = per_host_rate
+        self.per_host_burst = per_host_burst
+        self.retries = retries
+        self.client = client or httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            headers=headers or {"User-Agent": "AiTripPlannerBot/1.0"},
+            follow_redirects=True,
+        )
+        self.seen = set()
+        self.errors: Dict[str, str] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.per_host_rate, self.per_host_burst)
+        return self._buckets[host]
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET a URL, politely, retrying transport errors and 5xx with backoff."""
+        for attempt in range(self.retries + 1):
+            await self._bucket(url).acquire()
+            try:
+                response = await self.client.get(url, headers=headers)
+                if response.status_code < 500 or attempt == self.retries:
+                    return response
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(2 ** attempt)
+
+    def add(self, url: str) -> bool:
+        url = normalize_url(url)
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        self._queue.put_nowait(url)
+        return True
+
+    async def crawl(
+        self,
+        seeds: Iterable[str],
+        process: Processor,
+        headers: Optional[Callable[[str], Dict[str, str]]] = None,
+    ) -> List[str]:
+        """
+        Crawl from `seeds` until the frontier is empty; returns URLs that failed.
+
+        `headers(url)` can supply per-request headers, e.g. conditional-GET
+        validators, in which case `process` must also handle 304 responses.
+        """
+        for url in seeds:
+            self.add(url)
+        workers = [asyncio.create_task(self._worker(process, headers)) for _ in range(self.concurrency)]
+        try:
+            await self._queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return list(self.errors)
+
+    async def _worker(self, process: Processor, headers: Optional[Callable[[str], Dict[str, str]]]):
+        while True:
+            url = await self._queue.get()
+            try:
+                response = await self.fetch(url, headers=headers(url) if headers else None)
+                found = await process(url, response)
+                for link in found or ():
+                    self.add(link)
+            except Exception as e:
+                print(f"Error processing {url}: {e}")
+                self.errors[url] = str(e)
+            finally:
+                self._queue.task_done()
+
+    async def aclose(self):
+        await self.client.aclose()
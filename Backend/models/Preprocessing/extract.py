@@ -0,0 +1,174 @@
+import csv
+import io
+import re
+from collections import Counter
+from typing import Dict, List
+
+from bs4 import BeautifulSoup
+
+from models.Preprocessing.condense import page_blocks
+
+FIELDS = ("name", "category", "highlights", "duration", "price")
+# Fields scoring below this are sent to the LLM
+MIN_CONFIDENCE = 0.6
+
+NIGHTS_DAYS_RE = re.compile(r"(\d{1,2})\s*N(?:ights?)?\s*[/&,-]?\s*(\d{1,2})\s*D(?:ays?)?\b", re.IGNORECASE)
+DAYS_RE = re.compile(r"\b(\d{1,2})\s*Days?\b", re.IGNORECASE)
+PRICE_RE = re.compile(r"(?:₹|Rs\.?|INR)\s*([\d,]{3,})", re.IGNORECASE)
+DAY_LINE_RE = re.compile(r"^Day\s*0?(\d{1,2})\s*[:\-–.]?\s*(.*)$", re.IGNORECASE)
+HIGHLIGHT_HEADINGS = ("highlight", "places covered", "sightseeing", "attractions")
+
+CATEGORY_KEYWORDS = {
+    "Adventure": ("trek", "rafting", "paragliding", "camping", "bike", "skiing", "road trip", "expedition"),
+    "Nature": ("valley", "lake", "hill station", "waterfall", "backwater", "tea garden", "meadow", "scenic"),
+    "Heritage": ("fort", "palace", "heritage", "monument", "unesco", "ruins", "haveli"),
+    "Spiritual": ("temple", "pilgrimage", "darshan", "monastery", "gurudwara", "yatra", "ghat", "ashram"),
+    "Beach": ("beach", "island", "snorkel", "scuba", "coast"),
+    "Wildlife": ("safari", "national park", "wildlife", "tiger", "sanctuary"),
+    "Cultural": ("culture", "festival", "folk", "craft", "village", "cuisine"),
+    "Leisure": ("honeymoon", "leisure", "resort", "relax", "spa"),
+}
+
+
+def _field(value, confidence: float) -> Dict:
+    return {"value": value, "confidence": confidence if value not in (None, "", []) else 0.0}
+
+
+def _name(soup: BeautifulSoup) -> Dict:
+    h1 = soup.find("h1")
+    if h1 and h1.get_text(strip=True):
+        return _field(h1.get_text(" ", strip=True), 0.9)
+    if soup.title and soup.title.string:
+        # "Kerala Backwater Tour | Tours in India" -> "Kerala Backwater Tour"
+        return _field(re.split(r"\s[|\-–]\s", soup.title.string.strip())[0], 0.6)
+    return _field(None, 0)
+
+
+def _duration(text: str, day_count: int) -> Dict:
+    match = NIGHTS_DAYS_RE.search(text)
+    if match:
+        return _field(int(match.group(2)), 0.95)
+    counts = Counter(int(days) for days in DAYS_RE.findall(text) if 0 < int(days) < 60)
+    if counts:
+        days, hits = counts.most_common(1)[0]
+        agrees = day_count in (0, days)
+        return _field(days, 0.85 if agrees else 0.5 if hits == 1 else 0.65)
+    return _field(day_count or None, 0.6)
+
+
+def _price(text: str) -> Dict:
+    prices = [int(p.replace(",", "")) for p in PRICE_RE.findall(text)]
+    prices = [p for p in prices if 500 <= p <= 1_000_000]
+    if not prices:
+        return _field(None, 0)
+    # The headline price is usually the first one quoted on the page
+    return _field(prices[0], 0.8 if len(set(prices)) <= 3 else 0.65)
+
+
+def _category(text: str) -> Dict:
+    lowered = text.lower()
+    scores = Counter({
+        category: sum(lowered.count(keyword) for keyword in keywords)
+        for category, keywords in CATEGORY_KEYWORDS.items()
+    })
+    (best, top), *rest = scores.most_common()
+    total = sum(scores.values())
+    if top < 2:
+        return _field(None, 0)
+    return _field(best, min(0.9, top / total + 0.2))
+
+
+def _highlights(soup: BeautifulSoup, days: List[Dict]) -> Dict:
+    for heading in soup.find_all(["h2", "h3", "h4", "strong", "b"]):
+        if any(word in heading.get_text(strip=True).lower() for word in HIGHLIGHT_HEADINGS):
+            items_list = heading.find_next(["ul", "ol"])
+            if items_list:
+                items = [li.get_text(" ", strip=True) for li in items_list.find_all("li")]
+                items = [item for item in items if item][:3]
+                if len(items) >= 2:
+                    return _field(items, 0.8)
+    titles = [day["title"] for day in days if day["title"]]
+    if len(titles) >= 2:
+        return _field(titles[:3], 0.6)
+    return _field(None, 0)
+
+
+def _days(lines: List[str]) -> List[Dict]:
+    """"Day N: title" lines and the text under them, in page order."""
+    days: List[Dict] = []
+    for line in lines:
+        match = DAY_LINE_RE.match(line)
+        if match and (not days or int(match.group(1)) == days[-1]["day"] + 1):
+            days.append({"day": int(match.group(1)), "title": match.group(2).strip(), "text": []})
+        elif days and len(" ".join(days[-1]["text"])) < 400:
+            days[-1]["text"].append(line)
+    return days
+
+
+def analyze_page(html: str) -> Dict:
+    """
+    Pull package fields out of a tour page without an LLM.
+
+    Returns {"text", "fields": {field: {"value", "confidence"}}, "days", "blocks"}
+    where `text` is the full page text, `days` is the "Day N" breakdown found
+    in it and `blocks` are the content blocks for PageCondenser.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    text = soup.get_text(separator="\n", strip=True)
+    lines = text.split("\n")
+    days = _days(lines)
+    fields = {
+        "name": _name(soup),
+        "category": _category(text),
+        "highlights": _highlights(soup, days),
+        "duration": _duration(text, len(days)),
+        "price": _price(text),
+    }
+    # page_blocks strips nav/footer tags from the soup, so it runs last
+    return {"text": text, "fields": fields, "days": days, "blocks": page_blocks(soup)}
+
+
+def missing_fields(page: Dict) -> List[str]:
+    return [name for name in FIELDS if page["fields"][name]["confidence"] < MIN_CONFIDENCE]
+
+
+def format_output(fields: Dict, days: List[Dict]) -> str:
+    """Same layout the LLM prompt asks for: a CSV line, then one "Day N: ..." line per day."""
+    row = []
+    for name in FIELDS:
+        value = fields.get(name, {}).get("value")
+        if isinstance(value, list):
+            value = ", ".join(value)
+        row.append("N/A" if value in (None, "") else value)
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(row)
+    lines = [buffer.getvalue()]
+    for day in days:
+        summary = " ".join([day["title"], *day["text"]]).strip()
+        lines.append(f"Day {day['day']}: {summary[:300]}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Benchmark over saved pages: python -m models.Preprocessing.extract <dir of .html files>
+    import os
+    import sys
+    import time
+
+    directory = sys.argv[1]
+    paths = [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith((".html", ".php", ".htm"))]
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+
+    start = time.perf_counter()
+    results = [analyze_page(html) for html in pages]
+    elapsed = time.perf_counter() - start
+
+    field_misses = Counter(name for page in results for name in missing_fields(page))
+    needs_llm = sum(1 for page in results if missing_fields(page) or not page["days"])
+    print(f"{len(pages)} pages in {elapsed:.2f}s ({len(pages) / elapsed:,.1f} pages/s)")
+    print(f"LLM calls: {needs_llm} vs {len(pages)} before ({1 - needs_llm / max(len(pages), 1):.0%} fewer)")
+    for name in FIELDS:
+        print(f"  {name:<10} filled locally on {1 - field_misses[name] / max(len(pages), 1):.0%} of pages")
@@ -1,50 +1,28 @@
-import requests
-from bs4 import BeautifulSoup
-from langchain.chat_models import ChatOpenAI
-from langchain.schema import SystemMessage, HumanMessage
-import pandas as pd
-import os
+import asyncio
 import io
-import re
-import time
-
-# openai api key
-os.environ["OPENAI_API_KEY"] = "OPENAI_API_KEY"  # Replace with your key
-
-# link
-listing_url = "https://toursinindia.in/tour-packages-in-india.php"
-base_url = "https://toursinindia.in"
-
-# to get a list of all tour packages
-listing_resp = requests.get(listing_url)
-soup = BeautifulSoup(listing_resp.text, "html.parser")
-
-# all link visits
-links = []
-for a in soup.select("a[href*='/tours-india/']"):
-    href = a.get("href")
-    if href and href.endswith(".php"):
-        full_url = base_url + href if not href.startswith("http") else href
-        if full_url not in links:
-            links.append(full_url)
+import json
+import os
+import sys
+from typing import Dict, Optional, Tuple
 
-print(f"Found {len(links)} tour packages.")
+import pandas as pd
+from bs4 import BeautifulSoup
 
-# model initialization
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+from llm_client import complete
+from models.Preprocessing.crawler import Crawler
+from models.Preprocessing.crawl_state import CrawlState, content_hash
+from models.Preprocessing.extract import analyze_page, format_output, missing_fields
+from models.Preprocessing.condense import PageCondenser, pack_pages
+from tokens import count_tokens
 
-# Pcollection for a row 
-csv_rows = []
+# link (override with LISTING_URL / BASE_URL, e.g. to point at a local stub site)
+listing_url = os.getenv("LISTING_URL", "https://toursinindia.in/tour-packages-in-india.php")
+base_url = os.getenv("BASE_URL", "https://toursinindia.in")
 
-# process each tour packages , from the main listing page
-for url in links:
-    print(f"Processing: {url}")
-    try:
-        detail_resp = requests.get(url)
-        detail_soup = BeautifulSoup(detail_resp.text, "html.parser")
-        text_content = detail_soup.get_text(separator="\n", strip=True)
+# Tokens of page text sent to the LLM per page
+TOKEN_BUDGET = int(os.getenv("EXTRACT_TOKEN_BUDGET", "1500"))
 
-        system_msg = SystemMessage(content=f"""
+SYSTEM_PROMPT = """
 You are a travel assistant AI. Analyze the following travel itinerary text. The itinerary may include sections like "Day 1", "Day 2", etc.
 
 Extract and return the following:
@@ -66,39 +44,290 @@ Day 2: [summary of activities]
 
 Text:
 {text_content}
-""")
-        human_msg = HumanMessage(content="")
-
-        # call the model
-        result = llm([system_msg, human_msg])
-        output = result.content.strip()
-
-        # csv line extract(first line only)
-        csv_line = output.splitlines()[0]
-        
-        # Check if line  is not empty and contains comma ,  before appending
-        if csv_line and "," in csv_line:  
-            csv_rows.append(csv_line)
-        else:
-            print(f"Warning: Skipping URL {url} due to invalid CSV format from LLM output.")
-            print(f"LLM Output: {output}") # Print the LLM output for debugging
-
-        # save detailed itinerary breakdowns
-        with open("detailed_itineraries.txt", "a", encoding="utf-8") as f:
+"""
+
+
+def package_links(html: str):
+    """All tour package links on the listing page, in page order."""
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    for a in soup.select("a[href*='/tours-india/']"):
+        href = a.get("href")
+        if href and href.endswith(".php"):
+            links.append(base_url + href if not href.startswith("http") else href)
+    return links
+
+
+PARTIAL_PROMPT = """
+You are a travel assistant AI. From the travel package text below, extract only these fields and reply with a JSON object:
+{fields}
+
+Text:
+{text_content}
+"""
+
+FIELD_HINTS = {
+    "name": '"name": title of the travel package (infer a short name from the destination or theme if missing)',
+    "category": '"category": one of Adventure, Nature, Heritage, Spiritual, Leisure, Wildlife, Beach, Cultural',
+    "highlights": '"highlights": list of the top 3 attractions or experiences as short phrases',
+    "duration": '"duration": total number of days as an integer',
+    "price": '"price": approximate cost in INR as an integer, or "N/A" if not mentioned',
+    "days": '"days": list of strings, one per day, each "Day N: [summary of activities]"',
+}
+
+
+BATCH_PROMPT = """
+You are a travel assistant AI. Below are several travel package pages. For each page extract only the fields listed for it.
+Reply with a JSON object {{"pages": [{{"id": <page id>, ...fields}}]}} containing one entry per page.
+
+Field formats:
+{hints}
+
+{pages}
+"""
+
+
+def field_list(missing) -> str:
+    return "\n".join(f"- {FIELD_HINTS[name]}" for name in missing)
+
+
+async def extract_fields(text: str, missing) -> Dict:
+    """Ask the LLM for the missing fields of a single page."""
+    reply = await complete(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": PARTIAL_PROMPT.format(fields=field_list(missing), text_content=text)},
+            {"role": "user", "content": ""}
+        ],
+        temperature=0,
+        response_format={"type": "json_object"}
+    )
+    return json.loads(reply)
+
+
+class BatchExtractor:
+    """
+    Micro-batches partial extraction requests from concurrent page workers.
+
+    Requests wait up to `max_wait` seconds for company; pending pages are then
+    packed with pack_pages() into calls of at most `max_pages` pages and
+    `token_budget` prompt tokens, and each page gets back its own answer, or
+    None if the batched reply left it out.
+    """
+
+    def __init__(self, token_budget: int = 6000, max_pages: int = 4, max_wait: float = 1.0):
+        self.token_budget = token_budget
+        self.max_pages = max_pages
+        self.max_wait = max_wait
+        self.calls = 0
+        self._pending = []
+        self._timer = None
+        # The loop only keeps weak references to tasks; hold them until they finish
+        self._tasks = set()
+
+    async def extract(self, text: str, missing) -> Optional[Dict]:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, list(missing), future))
+        if len(self._pending) >= self.max_pages:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        batches = pack_pages(list(enumerate(text for text, _, _ in pending)), self.token_budget, self.max_pages)
+        for batch in batches:
+            task = asyncio.create_task(self._run([pending[i] for i in batch]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            if len(batch) == 1:
+                text, missing, future = batch[0]
+                answers = [await extract_fields(text, missing)]
+            else:
+                pages = "\n\n".join(
+                    f"### Page {i} (fields: {', '.join(missing)})\n{text}" for i, (text, missing, _) in enumerate(batch)
+                )
+                hints = field_list(sorted({name for _, missing, _ in batch for name in missing}))
+                reply = await complete(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": BATCH_PROMPT.format(hints=hints, pages=pages)},
+                        {"role": "user", "content": ""}
+                    ],
+                    temperature=0,
+                    response_format={"type": "json_object"}
+                )
+                by_id = {str(entry.get("id")): entry for entry in json.loads(reply).get("pages", [])}
+                answers = [by_id.get(str(i)) for i in range(len(batch))]
+            self.calls += 1
+            for (_, _, future), answer in zip(batch, answers):
+                if not future.done():
+                    future.set_result(answer)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+async def extract_package(page: Dict, text: str, batcher: Optional[BatchExtractor] = None) -> Tuple[str, int]:
+    """
+    Build the package output for a page, returning (output, LLM calls made).
+
+    Fields the rule-based extractor filled confidently are used as-is; the LLM
+    is only asked for the missing ones (or the day breakdown), given the
+    condensed page `text`, and only sees the full original prompt if its
+    partial answer can't be parsed. With a batcher the partial request may
+    share a call with other pages; those calls are counted on the batcher.
+    """
+    missing = missing_fields(page)
+    if not page["days"]:
+        missing.append("days")
+    if not missing:
+        return format_output(page["fields"], page["days"]), 0
+
+    try:
+        answer, calls = (await batcher.extract(text, missing), 0) if batcher is not None else (None, 0)
+        # An empty answer is still an answer; only a missing one is asked for again
+        if answer is None:
+            # No batcher, or the batched reply left this page out
+            answer, calls = await extract_fields(text, missing), 1
+    except ValueError:
+        full = await complete(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT.format(text_content=text)},
+                {"role": "user", "content": ""}
+            ],
+            temperature=0
+        )
+        return full.strip(), 2
+
+    fields = dict(page["fields"])
+    for name in missing:
+        if name != "days":
+            fields[name] = {"value": answer.get(name), "confidence": 1.0}
+    days = page["days"]
+    if "days" in missing:
+        days = []
+        for line in answer.get("days") or []:
+            number, _, summary = str(line).partition(":")
+            days.append({"day": len(days) + 1, "title": summary.strip() or number.strip(), "text": []})
+    return format_output(fields, days), calls
+
+
+def write_outputs(rows):
+    """Rebuild the catalog files from crawl state, replacing them atomically."""
+    # Pcollection for a row
+    csv_rows = []
+    with open("detailed_itineraries.txt.tmp", "w", encoding="utf-8") as f:
+        for row in rows:
+            url, output = row["url"], row["output"]
+            # csv line extract(first line only)
+            csv_line = output.splitlines()[0] if output else ""
+
+            # Check if line  is not empty and contains comma ,  before appending
+            if csv_line and "," in csv_line:
+                csv_rows.append(csv_line)
+            else:
+                print(f"Warning: Skipping URL {url} due to invalid CSV format from LLM output.")
+                print(f"LLM Output: {output}")  # Print the LLM output for debugging
+
+            # save detailed itinerary breakdowns
             f.write(f"--- {url} ---\n{output}\n\n")
+    os.replace("detailed_itineraries.txt.tmp", "detailed_itineraries.txt")
+
+    # Save rows to CSV
+    if csv_rows:
+        csv_text = "\n".join(csv_rows)
+        df = pd.read_csv(io.StringIO(csv_text))
+        df.to_csv("all_tour_packages.csv.tmp", index=False)
+        os.replace("all_tour_packages.csv.tmp", "all_tour_packages.csv")
+        print("Saved to all_tour_packages.csv")
+    else:
+        print("No valid data found to create CSV.")
+
+
+async def main(concurrency: int = 8, per_host_rate: float = 1.0):
+    crawler = Crawler(concurrency=concurrency, per_host_rate=per_host_rate)
+    condenser = PageCondenser()
+    batch_pages = int(os.getenv("EXTRACT_BATCH_PAGES", "4"))
+    batcher = BatchExtractor(token_budget=TOKEN_BUDGET * batch_pages, max_pages=batch_pages) if batch_pages > 1 else None
+    state = CrawlState(os.getenv("CRAWL_STATE_PATH", "./crawl_state.db"))
+    stats = {"extracted": 0, "unchanged": 0, "resumed": 0, "llm_calls": 0, "tokens_before": 0, "tokens_after": 0}
+
+    async def process(url, response):
+        if url == listing_url:
+            response.raise_for_status()
+            links = list(dict.fromkeys(package_links(response.text)))
+            state.track(links)
+            for link in links:
+                # Already handled before an interrupted run stopped
+                if state.checked_this_run(link):
+                    stats["resumed"] += 1
+                else:
+                    crawler.add(link)
+            print(f"Found {len(links)} tour packages.")
+            return None
+
+        if response.status_code == 304:
+            state.mark_unchanged(url)
+            stats["unchanged"] += 1
+            return None
+
+        response.raise_for_status()
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        # Parsing is CPU-bound; keep it off the event loop so fetches keep flowing
+        page_info = await asyncio.to_thread(analyze_page, response.text)
+        text_hash = content_hash(page_info["text"])
+        page = state.get(url)
+        if page and page["output"] and page["content_hash"] == text_hash:
+            state.save(url, etag, last_modified, text_hash, None)
+            stats["unchanged"] += 1
+            return None
+
+        print(f"Processing: {url}")
+        condenser.observe(page_info["blocks"])
+        text = condenser.condense(page_info["blocks"], TOKEN_BUDGET)
+        stats["tokens_before"] += count_tokens(page_info["text"])
+        stats["tokens_after"] += count_tokens(text)
+        output, llm_calls = await extract_package(page_info, text, batcher)
+        state.save(url, etag, last_modified, text_hash, output)
+        stats["extracted"] += 1
+        stats["llm_calls"] += llm_calls
+        return None
+
+    try:
+        failed = await crawler.crawl([listing_url], process, headers=state.conditional_headers)
+    finally:
+        await crawler.aclose()
+
+    if batcher is not None:
+        stats["llm_calls"] += batcher.calls
+    print(
+        f"Extracted {stats['extracted']} ({stats['llm_calls']} LLM calls), unchanged {stats['unchanged']}, "
+        f"resumed past {stats['resumed']}, failed {len(failed)}."
+    )
+    if stats["tokens_after"]:
+        print(f"Page tokens {stats['tokens_before']:,} -> {stats['tokens_after']:,} after condensation.")
+    # Leave the run open when pages failed, so the next run only retries those
+    if not failed:
+        state.finish_run()
+    write_outputs(state.outputs())
+    state.close()
+
 
-        # Be polite to the server
-        time.sleep(2)
-
-    except Exception as e:
-        print(f"Error processing {url}: {e}")
-        continue
-
-# Save rows to CSV
-if csv_rows:   
-    csv_text = "\n".join(csv_rows)
-    df = pd.read_csv(io.StringIO(csv_text))
-    df.to_csv("all_tour_packages.csv", index=False)
-    print("Saved to all_tour_packages.csv")
-else:
-    print("No valid data found to create CSV.")
\ No newline at end of file
+# Run from Backend/: python -m models.Preprocessing.scrape [concurrency] [requests/sec per host]
+if __name__ == "__main__":
+    asyncio.run(main(
+        concurrency=int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        per_host_rate=float(sys.argv[2]) if len(sys.argv) > 2 else 1.0,
+    ))
@@ -0,0 +1,249 @@
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:  # dense matrices are fine at catalog scale
+    sparse = None
+
+from models.catalog.search import get_package_index, tokenize
+
+# How much each signal counts towards similarity
+WEIGHTS = {"text": 0.6, "category": 0.2, "duration": 0.1, "price": 0.1}
+# Days / log-price difference at which numeric similarity falls to ~0.37
+DURATION_SCALE = 3.0
+PRICE_SCALE = 0.7
+PRECOMPUTE_LIMIT = 50_000
+
+
+class Recommender:
+    """
+    "Similar trips" over the catalog.
+
+    Each package is a TF-IDF vector over its name, category and highlights
+    (a SciPy CSR matrix when SciPy is installed), plus its category code,
+    duration and log price. A batch of queries is scored against the whole
+    catalog with one sparse-dense matrix product and broadcast numeric
+    similarities, and the top k per query come from argpartition. Optionally
+    a top-k neighbour table is precomputed so similar_to() is a lookup.
+    """
+
+    def __init__(self, packages: Sequence[Dict], precompute_k: Optional[int] = None, block_size: int = 512):
+        self.packages = packages
+        self.block_size = block_size
+        vocabulary: Dict[str, int] = {}
+        rows, cols, counts = [], [], []
+        for doc_id, package in enumerate(packages):
+            tokens = tokenize(f"{package['name']} {package['category']} {package['highlights']}")
+            for token in tokens:
+                rows.append(doc_id)
+                cols.append(vocabulary.setdefault(token, len(vocabulary)))
+                counts.append(1.0)
+        self.vocabulary = vocabulary
+        count, width = len(packages), max(len(vocabulary), 1)
+        rows, cols, counts = np.asarray(rows, dtype=np.int32), np.asarray(cols, dtype=np.int32), np.asarray(counts, dtype=np.float32)
+        # Sublinear tf, smoothed idf, rows L2-normalised so dot products are cosines
+        if sparse is not None:
+            tf = sparse.csr_matrix((counts, (rows, cols)), shape=(count, width), dtype=np.float32)
+            tf.sum_duplicates()
+            tf.data = 1 + np.log(tf.data)
+            df = np.bincount(tf.indices, minlength=width)
+        else:
+            tf = np.zeros((count, width), dtype=np.float32)
+            np.add.at(tf, (rows, cols), counts)
+            nonzero = tf > 0
+            tf[nonzero] = 1 + np.log(tf[nonzero])
+            df = nonzero.sum(axis=0)
+        self.idf = (np.log((1 + count) / (1 + df)) + 1).astype(np.float32)
+        if sparse is not None:
+            tfidf = tf @ sparse.diags(self.idf)
+            norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+            self.tfidf = sparse.diags(1 / np.maximum(norms, 1e-12)).dot(tfidf).tocsr().astype(np.float32)
+        else:
+            tfidf = tf * self.idf
+            self.tfidf = tfidf / np.maximum(np.linalg.norm(tfidf, axis=1, keepdims=True), 1e-12)
+
+        categories = sorted({package["category"].lower() for package in packages})
+        self.category_codes = {name: code for code, name in enumerate(categories)}
+        self.category = np.array([self.category_codes[p["category"].lower()] for p in packages], dtype=np.int32)
+        self.duration = np.array([math.nan if p["duration"] is None else p["duration"] for p in packages], dtype=np.float32)
+        self.log_price = np.log(np.array([math.nan if p["price"] is None else max(p["price"], 1) for p in packages], dtype=np.float32))
+
+        self.neighbors: Optional[np.ndarray] = None
+        self.neighbor_scores: Optional[np.ndarray] = None
+        if precompute_k:
+            self.precompute(precompute_k)
+
+    def __len__(self) -> int:
+        return len(self.packages)
+
+    def _query_vectors(self, texts: Sequence[Optional[str]]) -> np.ndarray:
+        matrix = np.zeros((len(texts), max(len(self.vocabulary), 1)), dtype=np.float32)
+        for i, text in enumerate(texts):
+            columns = [self.vocabulary[token] for token in tokenize(text or "") if token in self.vocabulary]
+            if columns:
+                np.add.at(matrix[i], columns, 1.0)
+        nonzero = matrix > 0
+        matrix[nonzero] = 1 + np.log(matrix[nonzero])
+        matrix *= self.idf
+        return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    def _scores(self, text: np.ndarray, categories: np.ndarray, durations: np.ndarray, log_prices: np.ndarray,
+                use_text: np.ndarray) -> np.ndarray:
+        """(batch, catalog) similarity matrix; signals a query lacks are left out of its weighting."""
+        scores = np.zeros((len(categories), len(self)), dtype=np.float32)
+        total = np.zeros((len(categories), 1), dtype=np.float32)
+        if use_text.any():
+            scores += np.asarray(self.tfidf @ text.T).T * (WEIGHTS["text"] * use_text[:, None])
+            total[:, 0] += WEIGHTS["text"] * use_text
+        has_category = categories >= 0
+        if has_category.any():
+            scores += (categories[:, None] == self.category[None, :]) * np.float32(WEIGHTS["category"])
+            total[:, 0] += WEIGHTS["category"] * has_category
+        for name, values, query, scale in (
+            ("duration", self.duration, durations, DURATION_SCALE),
+            ("price", self.log_price, log_prices, PRICE_SCALE),
+        ):
+            known = ~np.isnan(query)
+            if known.any():
+                # Only rows for queries that have this signal
+                similarity = (query[known, None] - values[None, :]) * np.float32(1 / scale)
+                np.square(similarity, out=similarity)
+                np.negative(similarity, out=similarity)
+                np.exp(similarity, out=similarity)
+                # Packages with an unknown value get no credit for it
+                np.nan_to_num(similarity, copy=False)
+                scores[known] += similarity * np.float32(WEIGHTS[name])
+                total[known, 0] += WEIGHTS[name]
+        scores /= np.maximum(total, 1e-12)
+        return scores
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k best packages per query row, best first: (batch, k)."""
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return np.empty((scores.shape[0], 0), dtype=np.int64)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < scores.shape[1] else np.argsort(-scores, axis=1)
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(top, order, axis=1)
+
+    def _package_batch(self, ids: np.ndarray, k: int):
+        text = self.tfidf[ids]
+        text = text.toarray() if sparse is not None else text
+        scores = self._scores(text, self.category[ids], self.duration[ids], self.log_price[ids],
+                              np.ones(len(ids), dtype=np.float32))
+        # A package is not similar to itself
+        scores[np.arange(len(ids)), ids] = -np.inf
+        top = self._top_k(scores, k)
+        return top, np.take_along_axis(scores, top, axis=1)
+
+    def precompute(self, k: int = 10):
+        """Fill the top-k neighbour table, a block of packages at a time."""
+        neighbors = np.empty((len(self), k), dtype=np.int32)
+        neighbor_scores = np.empty((len(self), k), dtype=np.float32)
+        for start in range(0, len(self), self.block_size):
+            ids = np.arange(start, min(start + self.block_size, len(self)))
+            top, scores = self._package_batch(ids, k + 1)
+            neighbors[ids] = top[:, :k]
+            neighbor_scores[ids] = scores[:, :k]
+        self.neighbors, self.neighbor_scores = neighbors, neighbor_scores
+
+    def _results(self, top: np.ndarray, scores: np.ndarray) -> List[Dict]:
+        results = []
+        for i, score in zip(top, scores):
+            if not np.isfinite(score) or score <= 0:
+                continue
+            package = dict(self.packages[int(i)])
+            package["similarity"] = round(float(score), 4)
+            results.append(package)
+        return results
+
+    def similar_to(self, package_id: int, k: int = 10) -> List[Dict]:
+        if self.neighbors is not None and k <= self.neighbors.shape[1]:
+            return self._results(self.neighbors[package_id, :k], self.neighbor_scores[package_id, :k])
+        top, scores = self._package_batch(np.array([package_id]), k)
+        return self._results(top[0], scores[0])
+
+    def recommend_batch(self, queries: Sequence[Dict], k: int = 10) -> List[List[Dict]]:
+        """
+        Top-k packages for many free-form queries at once.
+
+        Each query may have "text", "category", "days" and "price"; whatever is
+        missing just doesn't count towards that query's score.
+        """
+        texts = [query.get("text") for query in queries]
+        vectors = self._query_vectors(texts)
+        categories = np.array([self.category_codes.get((query.get("category") or "").lower(), -1) for query in queries], dtype=np.int32)
+        durations = np.array([query.get("days") or math.nan for query in queries], dtype=np.float32)
+        log_prices = np.log(np.array([query.get("price") or math.nan for query in queries], dtype=np.float32))
+        use_text = (np.abs(vectors).sum(axis=1) > 0).astype(np.float32)
+        scores = self._scores(vectors, categories, durations, log_prices, use_text)
+        top = self._top_k(scores, k)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        return [self._results(top[j], top_scores[j]) for j in range(len(queries))]
+
+    def recommend(self, text: Optional[str] = None, category: Optional[str] = None, days: Optional[int] = None,
+                  price: Optional[float] = None, k: int = 10) -> List[Dict]:
+        return self.recommend_batch([{"text": text, "category": category, "days": days, "price": price}], k)[0]
+
+
+_recommender: Optional[Recommender] = None
+
+
+def get_recommender() -> Recommender:
+    """Recommender over the same packages (and ids) as the search index."""
+    global _recommender
+    if _recommender is None:
+        packages = get_package_index().packages
+        # The neighbour table costs O(n^2) to build; past this size similar_to() computes on demand
+        _recommender = Recommender(packages, precompute_k=10 if len(packages) <= PRECOMPUTE_LIMIT else None)
+    return _recommender
+
+
+# Benchmark: python -m models.catalog.recommend [catalog rows] [batch size]
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    if rows:
+        words = ["fort", "palace", "beach", "trek", "temple", "safari", "lake", "houseboat", "desert", "camel",
+                 "rafting", "monastery", "tea", "garden", "waterfall", "snorkeling", "heritage", "walk", "sunset",
+                 "cruise", "kerala", "goa", "manali", "jaipur", "leh", "rishikesh", "ooty", "varanasi", "hampi", "coorg"]
+        categories = ["Adventure", "Nature", "Heritage", "Spiritual", "Leisure", "Wildlife", "Beach", "Cultural"]
+        rng = random.Random(0)
+        packages = [{
+            "id": i, "name": " ".join(rng.sample(words, 2)).title(), "category": rng.choice(categories),
+            "highlights": " ".join(rng.sample(words, 4)), "duration": rng.randint(2, 14),
+            "price": rng.randrange(3000, 150000, 500),
+        } for i in range(rows)]
+    else:
+        packages = get_package_index().packages
+
+    start = time.perf_counter()
+    recommender = Recommender(packages, precompute_k=10 if len(packages) <= PRECOMPUTE_LIMIT else None)
+    print(f"Built for {len(recommender):,} packages in {time.perf_counter() - start:.2f}s"
+          f" ({'sparse' if sparse is not None else 'dense'} TF-IDF, {len(recommender.vocabulary):,} terms)")
+
+    queries = [{"text": "relaxing beach holiday with water sports", "days": 4, "price": 20000},
+               {"text": "temple pilgrimage", "category": "Spiritual"},
+               {"text": "trek in the mountains", "days": 7}] * (batch // 3 + 1)
+    queries = queries[:batch]
+    start = time.perf_counter()
+    runs = 20
+    for _ in range(runs):
+        recommender.recommend_batch(queries, k=10)
+    elapsed = time.perf_counter() - start
+    print(f"recommend_batch: {runs * batch / elapsed:,.0f} queries/s (batches of {batch})")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        recommender.similar_to(i % len(recommender), k=5)
+    elapsed = time.perf_counter() - start
+    print(f"similar_to: {1000 / elapsed:,.0f} lookups/s")
+    print([p["name"] for p in recommender.recommend("beach water sports", days=4, k=3)])
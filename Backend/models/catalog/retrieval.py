@@ -0,0 +1,256 @@
+import asyncio
+import csv
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from models.catalog.search import tokenize
+from tokens import count_tokens
+
+# Written by models/Preprocessing/scrape.py: "--- <url> ---" then the package's CSV line and "Day N: ..." lines
+BLOCK_RE = re.compile(r"^--- (\S+) ---$", re.MULTILINE)
+DAY_LINE_RE = re.compile(r"^\W*Day\s*0?(\d{1,2})\s*[:\-–.]\s*(.+)$", re.IGNORECASE)
+URL_SLUG_RE = re.compile(r"/([^/]+?)(?:\.php|\.html?)?$")
+
+DEFAULT_CORPUS_PATH = os.getenv("ITINERARY_CORPUS_PATH", "detailed_itineraries.txt")
+
+
+def parse_corpus(text: str) -> List[Dict]:
+    """
+    One chunk per itinerary day.
+
+    Each chunk is {"package", "url", "day", "text", "keys"} where `keys` are
+    the destination terms of its package (from the name and the URL slug).
+    """
+    chunks: List[Dict] = []
+    blocks = BLOCK_RE.split(text)
+    # split() gives [preamble, url, body, url, body, ...]
+    for url, body in zip(blocks[1::2], blocks[2::2]):
+        lines = [line.strip() for line in body.strip().splitlines() if line.strip()]
+        if not lines:
+            continue
+        fields = next(csv.reader([lines[0]]), [])
+        name = fields[0].strip() if fields and not DAY_LINE_RE.match(lines[0]) else ""
+        duration = fields[3].strip() if len(fields) > 4 else ""
+        price = fields[4].strip() if len(fields) > 4 else ""
+        slug = URL_SLUG_RE.search(url)
+        keys = set(tokenize(name)) | set(tokenize((slug.group(1) if slug else "").replace("-", " ")))
+        for line in lines:
+            match = DAY_LINE_RE.match(line)
+            if match:
+                chunks.append({
+                    "package": name or (slug.group(1).replace("-", " ").title() if slug else url),
+                    "url": url,
+                    "duration": duration,
+                    "price": price,
+                    "day": int(match.group(1)),
+                    "text": match.group(2).strip(),
+                    "keys": keys,
+                })
+    return chunks
+
+
+class ItineraryRetriever:
+    """
+    Day-level lexical index over the scraped detailed itineraries.
+
+    Chunks are keyed by destination terms, so a request only looks at the
+    packages for its destination; those days are ranked with BM25 against the
+    travel style, and the best packages' days are packed, in day order, into a
+    token budget for the prompt. `version` fingerprints the corpus it was
+    built from ("" when there is none).
+    """
+
+    def __init__(self, chunks: List[Dict], k1: float = 1.2, b: float = 0.75, version: str = ""):
+        self.chunks = chunks
+        self.version = version
+        self.k1, self.b = k1, b
+        self.by_destination: Dict[str, List[int]] = defaultdict(list)
+        self.term_counts: List[Counter] = []
+        document_frequency: Counter = Counter()
+        for i, chunk in enumerate(chunks):
+            for key in chunk["keys"]:
+                self.by_destination[key].append(i)
+            counts = Counter(tokenize(chunk["text"]))
+            self.term_counts.append(counts)
+            document_frequency.update(counts.keys())
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 1.0
+        self.idf = {
+            term: math.log(1 + (len(chunks) - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()
+        }
+        # Counted once here, off the request path; +4 for the "- Day N: " framing
+        self.token_counts = [count_tokens(chunk["text"]) + 4 for chunk in chunks]
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_CORPUS_PATH) -> "ItineraryRetriever":
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return cls([])
+        return cls(parse_corpus(text), version=hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest())
+
+    def _bm25(self, i: int, terms: List[str]) -> float:
+        counts, norm = self.term_counts[i], self.k1 * (1 - self.b + self.b * self.lengths[i] / (self.avg_length or 1))
+        score = 0.0
+        for term in terms:
+            tf = counts.get(term)
+            if tf:
+                score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return score
+
+    def retrieve(self, destination: str, requirement: str = "", token_budget: int = 400, max_packages: int = 2) -> List[Dict]:
+        """Best-matching day chunks for a destination, grouped by package and in day order."""
+        candidates = sorted({i for key in tokenize(destination) for i in self.by_destination.get(key, ())})
+        if not candidates:
+            return []
+        terms = list(dict.fromkeys(tokenize(requirement)))
+        packages: Dict[str, List[int]] = defaultdict(list)
+        for i in candidates:
+            packages[self.chunks[i]["url"]].append(i)
+        # Rank packages by how many destination terms they share, then by style match
+        destination_terms = set(tokenize(destination))
+        ranked = sorted(
+            packages.values(),
+            key=lambda ids: (
+                -len(destination_terms & self.chunks[ids[0]]["keys"]),
+                -sum(self._bm25(i, terms) for i in ids) / len(ids),
+                len(ids),
+            ),
+        )
+        selected, used = [], 0
+        for ids in ranked[:max_packages]:
+            for i in sorted(ids, key=lambda i: self.chunks[i]["day"]):
+                if used + self.token_counts[i] > token_budget:
+                    break
+                selected.append(self.chunks[i])
+                used += self.token_counts[i]
+        return selected
+
+    def context(self, destination: str, requirement: str = "", token_budget: int = 400) -> str:
+        """The retrieved days formatted for a prompt, or "" when nothing matches."""
+        chunks = self.retrieve(destination, requirement, token_budget)
+        lines, package = [], None
+        for chunk in chunks:
+            if chunk["package"] != package:
+                package = chunk["package"]
+                details = ", ".join(part for part in (
+                    f"{chunk['duration']} days" if chunk["duration"] else "",
+                    f"₹{chunk['price']}" if chunk["price"] and chunk["price"] != "N/A" else "",
+                ) if part)
+                lines.append(f"{package}{f' ({details})' if details else ''}:")
+            lines.append(f"- Day {chunk['day']}: {chunk['text']}")
+        return "\n".join(lines)
+
+
+_retriever: Optional[ItineraryRetriever] = None
+_retriever_mtime: Optional[float] = None
+_retriever_lock = threading.Lock()
+
+# How often watch_corpus() checks whether the scraper rewrote the corpus
+CORPUS_CHECK_SECONDS = float(os.getenv("ITINERARY_CORPUS_CHECK_SECONDS", "60"))
+
+
+def _corpus_mtime() -> Optional[float]:
+    try:
+        return os.stat(DEFAULT_CORPUS_PATH).st_mtime
+    except OSError:
+        return None
+
+
+def get_retriever() -> ItineraryRetriever:
+    """
+    Shared retriever. Only the first call builds it (the app does that at
+    startup, off the event loop); after that this is a plain read, and
+    watch_corpus() swaps in a rebuilt index when the corpus changes.
+    """
+    global _retriever, _retriever_mtime
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever_mtime = _corpus_mtime()
+                _retriever = ItineraryRetriever.from_file(DEFAULT_CORPUS_PATH)
+    return _retriever
+
+
+def reload_retriever() -> bool:
+    """Rebuild the retriever if the corpus file changed; blocking, so run it in a thread."""
+    global _retriever, _retriever_mtime
+    mtime = _corpus_mtime()
+    if _retriever is not None and mtime == _retriever_mtime:
+        return False
+    retriever = ItineraryRetriever.from_file(DEFAULT_CORPUS_PATH)
+    with _retriever_lock:
+        # One reference assignment, so requests see either the old index or the new one
+        _retriever, _retriever_mtime = retriever, mtime
+    return True
+
+
+def corpus_version() -> str:
+    """Fingerprint of the loaded corpus; changes when watch_corpus() picks up a new one."""
+    return get_retriever().version
+
+
+async def watch_corpus(interval: float = CORPUS_CHECK_SECONDS):
+    """Background task: pick up a re-scraped corpus without blocking the event loop."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await asyncio.to_thread(reload_retriever):
+                print(f"Itinerary corpus reloaded: {len(_retriever.chunks)} day chunks")
+        except Exception as e:
+            print("Itinerary corpus reload failed:", e)
+
+
+def reference_itineraries(destination: str, requirement: str = "", token_budget: int = 400) -> str:
+    """Prompt section with real catalog itineraries for the destination, or "" if there are none."""
+    try:
+        context = get_retriever().context(destination, requirement, token_budget)
+    except Exception as e:
+        print("Itinerary retrieval failed:", e)
+        return ""
+    if not context:
+        return ""
+    return (
+        "Reference itineraries from our catalog for this destination (use them for realistic places, "
+        "pacing and prices, but plan for the traveller's own dates, budget and style):\n" + context
+    )
+
+
+# Benchmark: python -m models.catalog.retrieval [detailed_itineraries.txt] [destination] [requirement]
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            retriever = ItineraryRetriever(parse_corpus(f.read()))
+    else:
+        rng = random.Random(0)
+        places = [f"place{i}" for i in range(2000)] + ["manali", "kerala", "goa", "jaipur"]
+        words = ["trek", "temple", "beach", "fort", "market", "lake", "sunset", "cruise", "museum", "paragliding"]
+        blocks = []
+        for i in range(5000):
+            place = rng.choice(places)
+            days = rng.randint(2, 8)
+            lines = [f"{place.title()} Getaway {i},Nature,\"a, b, c\",{days},{rng.randrange(5000, 60000, 500)}"]
+            lines += [f"Day {d}: {' '.join(rng.sample(words, 4))} in {place}" for d in range(1, days + 1)]
+            blocks.append(f"--- https://example.com/tours-india/{place}-getaway-{i}.php ---\n" + "\n".join(lines) + "\n")
+        retriever = ItineraryRetriever(parse_corpus("\n".join(blocks)))
+
+    destination = sys.argv[2] if len(sys.argv) > 2 else "Manali"
+    requirement = sys.argv[3] if len(sys.argv) > 3 else "Include adventure sports like paragliding and a trek"
+    retriever.context(destination, requirement)
+    runs = 1000
+    start = time.perf_counter()
+    for _ in range(runs):
+        context = retriever.context(destination, requirement)
+    elapsed = (time.perf_counter() - start) / runs
+    print(f"{len(retriever.chunks):,} chunks; retrieval {elapsed * 1000:.3f} ms per request")
+    print(context)
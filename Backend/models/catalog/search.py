@@ -0,0 +1,312 @@
+import csv
+import math
+import os
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# "4-day", "4 days", "4D"
+QUERY_DAYS_RE = re.compile(r"\b(\d{1,2})\s*-?\s*(?:days?|d)\b", re.IGNORECASE)
+# "under ₹15000", "below Rs 15,000", "less than 15k"
+QUERY_MAX_PRICE_RE = re.compile(
+    r"\b(?:under|below|within|less than|upto|up to|max)\s*(?:₹|rs\.?|inr)?\s*([\d,]+)\s*(k?)\b", re.IGNORECASE
+)
+STOPWORDS = {"a", "an", "the", "and", "or", "of", "in", "to", "for", "with", "trip", "tour", "package", "day", "days"}
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "finetune", "trip_planner.csv")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def parse_query(q: str) -> Dict:
+    """
+    Pull numeric filters out of a free-text query.
+
+    "a 4-day heritage trip under ₹15000" -> {"text": "a heritage trip", "days": 4, "max_price": 15000}
+    """
+    parsed: Dict = {}
+    match = QUERY_MAX_PRICE_RE.search(q)
+    if match:
+        parsed["max_price"] = int(match.group(1).replace(",", "")) * (1000 if match.group(2) else 1)
+        q = q[:match.start()] + q[match.end():]
+    match = QUERY_DAYS_RE.search(q)
+    if match:
+        parsed["days"] = int(match.group(1))
+        q = q[:match.start()] + q[match.end():]
+    parsed["text"] = " ".join(q.split())
+    return parsed
+
+
+def _price(value) -> float:
+    try:
+        return float(str(value).replace(",", "").replace("₹", "").strip())
+    except ValueError:
+        return math.nan
+
+
+def _duration(value) -> float:
+    try:
+        return float(int(value))
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class PackageIndex:
+    """
+    In-memory search over the tour package catalog.
+
+    Text goes into an inverted index scored with BM25: each term's postings are
+    NumPy arrays of doc ids (ascending) and precomputed BM25 term weights, so a
+    query only touches the postings of its own terms. Price and duration each
+    have a sorted index, so range filters are two binary searches. When the
+    filters match fewer packages than the query terms do, those candidates are
+    scored directly by binary search into the postings instead. Results are
+    ranked with a partial sort; with no text they come back cheapest first.
+    """
+
+    def __init__(self, rows: Iterable[Dict], k1: float = 1.2, b: float = 0.75):
+        self.packages: List[Dict] = []
+        vocabulary: Dict[str, int] = {}
+        term_ids = array("i")
+        doc_ids = array("i")
+        lengths = array("i")
+        for row in rows:
+            doc_id = len(self.packages)
+            package = {
+                "id": doc_id,
+                "name": (row.get("name") or "").strip(),
+                "category": (row.get("category") or "").strip().title(),
+                "highlights": (row.get("highlights") or "").strip(),
+            }
+            duration, price = _duration(row.get("duration")), _price(row.get("price"))
+            package["duration"] = None if math.isnan(duration) else int(duration)
+            package["price"] = None if math.isnan(price) else (int(price) if price.is_integer() else price)
+            self.packages.append(package)
+            # Name terms count twice so title matches outrank passing mentions
+            tokens = tokenize(package["name"]) * 2 + tokenize(package["category"]) + tokenize(package["highlights"])
+            lengths.append(len(tokens))
+            term_ids.extend([vocabulary.setdefault(token, len(vocabulary)) for token in tokens])
+            doc_ids.extend([doc_id] * len(tokens))
+
+        count = len(self.packages)
+        # (term, doc) pairs and their term frequencies in one vectorized pass,
+        # sorted by term then doc so every term's postings are a contiguous slice
+        keys, tfs = np.unique(
+            np.frombuffer(term_ids, dtype=np.int32).astype(np.int64) * max(count, 1) + np.frombuffer(doc_ids, dtype=np.int32),
+            return_counts=True,
+        )
+        terms = keys // max(count, 1)
+        docs = (keys % max(count, 1)).astype(np.int32)
+        lengths = np.frombuffer(lengths, dtype=np.int32).astype(np.float32)
+        avg_length = float(lengths.mean()) if count and lengths.any() else 1.0
+        norm = k1 * (1 - b + b * lengths / avg_length)
+        tfs = tfs.astype(np.float32)
+        weights = tfs * (k1 + 1) / (tfs + norm[docs])
+        bounds = np.searchsorted(terms, np.arange(len(vocabulary) + 1))
+        self.postings: Dict[str, tuple] = {}
+        for term, term_id in vocabulary.items():
+            start, end = bounds[term_id], bounds[term_id + 1]
+            idf = math.log(1 + (count - (end - start) + 0.5) / (end - start + 0.5))
+            weights[start:end] *= idf
+            self.postings[term] = (docs[start:end], weights[start:end])
+
+        self.price = np.array([math.nan if p["price"] is None else p["price"] for p in self.packages], dtype=np.float64)
+        self.duration = np.array([math.nan if p["duration"] is None else p["duration"] for p in self.packages], dtype=np.float64)
+        categories = sorted({p["category"].lower() for p in self.packages})
+        self.category_codes = {name: code for code, name in enumerate(categories)}
+        self.category = np.array([self.category_codes[p["category"].lower()] for p in self.packages], dtype=np.int16)
+        # Sorted numeric indexes; NaN (unknown) sorts last and never matches a range
+        self.by_price = np.argsort(self.price, kind="stable").astype(np.int32)
+        self.sorted_price = self.price[self.by_price]
+        self.by_duration = np.argsort(self.duration, kind="stable").astype(np.int32)
+        self.sorted_duration = self.duration[self.by_duration]
+        # Scratch buffers reused across queries
+        self._scores = np.zeros(count, dtype=np.float32)
+        self._marks = np.zeros(count, dtype=bool)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.packages)
+
+    @classmethod
+    def from_csv(cls, path: str = DEFAULT_CATALOG_PATH) -> "PackageIndex":
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(csv.DictReader(f))
+
+    @staticmethod
+    def _range(sorted_values: np.ndarray, order: np.ndarray, low: Optional[float], high: Optional[float]) -> np.ndarray:
+        start = 0 if low is None else np.searchsorted(sorted_values, low, side="left")
+        end = np.searchsorted(sorted_values, math.inf if high is None else high, side="right")
+        return order[start:end]
+
+    def _accumulate(self, terms: List[str]):
+        """Union of the terms' postings with summed BM25 weights."""
+        if len(terms) == 1:
+            return self.postings[terms[0]]
+        with self._lock:
+            # Each term's doc ids are unique, so plain fancy-index adds are safe
+            for term in terms:
+                docs, weights = self.postings[term]
+                self._scores[docs] += weights
+                self._marks[docs] = True
+            docs = np.flatnonzero(self._marks).astype(np.int32)
+            scores = self._scores[docs]
+            self._scores[docs] = 0
+            self._marks[docs] = False
+        return docs, scores
+
+    def _intersect(self, ranges: List[np.ndarray]) -> np.ndarray:
+        """Doc ids (ascending) present in every range."""
+        ranges = sorted(ranges, key=len)
+        if len(ranges) == 1:
+            return np.sort(ranges[0])
+        with self._lock:
+            for other in ranges[1:]:
+                self._marks[other] = True
+                smallest = ranges[0][self._marks[ranges[0]]]
+                self._marks[other] = False
+                ranges[0] = smallest
+        return np.sort(ranges[0])
+
+    def _score(self, terms: List[str], docs: np.ndarray) -> np.ndarray:
+        """BM25 scores of the given docs, by binary search into each term's postings."""
+        scores = np.zeros(len(docs), dtype=np.float32)
+        for term in terms:
+            postings, weights = self.postings[term]
+            at = np.searchsorted(postings, docs)
+            found = at < len(postings)
+            found[found] = postings[at[found]] == docs[found]
+            scores[found] += weights[at[found]]
+        return scores
+
+    def search(
+        self,
+        text: str = "",
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_days: Optional[int] = None,
+        max_days: Optional[int] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Dict:
+        """Ranked, filtered, paginated search; returns {"total", "results"}."""
+        if category is not None and category.lower() not in self.category_codes:
+            return {"total": 0, "results": []}
+        terms = [term for term in dict.fromkeys(tokenize(text)) if term in self.postings]
+        if text.strip() and not terms and tokenize(text):
+            # Every query word is unknown to the catalog
+            return {"total": 0, "results": []}
+
+        # Numeric filters: each is a slice of a sorted index; intersect them
+        ranges = []
+        if min_price is not None or max_price is not None:
+            ranges.append(self._range(self.sorted_price, self.by_price, min_price, max_price))
+        if min_days is not None or max_days is not None:
+            ranges.append(self._range(self.sorted_duration, self.by_duration, min_days, max_days))
+        candidates = self._intersect(ranges) if ranges else None
+
+        keep = None
+        postings_size = sum(len(self.postings[term][0]) for term in terms)
+        if terms and candidates is not None and len(candidates) < postings_size:
+            # Filters are the narrower side: score just the matching packages
+            docs = candidates
+            scores = self._score(terms, docs)
+            keep = scores > 0
+        elif terms:
+            docs, scores = self._accumulate(terms)
+            if candidates is not None:
+                with self._lock:
+                    self._marks[candidates] = True
+                    keep = self._marks[docs]
+                    self._marks[candidates] = False
+        else:
+            docs = candidates if candidates is not None else self.by_price
+            scores = None
+
+        if category is not None:
+            mask = self.category[docs] == self.category_codes[category.lower()]
+            keep = mask if keep is None else keep & mask
+        if keep is not None:
+            docs = docs[keep]
+            scores = scores[keep] if scores is not None else None
+
+        total = len(docs)
+        end = min(total, offset + limit)
+        if offset >= end:
+            page = np.empty(0, dtype=np.int64)
+        else:
+            # Only the first `end` hits need ordering
+            keys = -scores if scores is not None else self.price[docs]
+            top = np.argpartition(keys, end - 1)[:end] if end < total else np.arange(total)
+            top = top[np.lexsort((docs[top], keys[top]))]
+            page = top[offset:end]
+        results = []
+        for i in page:
+            package = dict(self.packages[int(docs[i])])
+            package["score"] = round(float(scores[i]), 4) if scores is not None else 0.0
+            results.append(package)
+        return {"total": total, "results": results}
+
+
+_package_index: Optional[PackageIndex] = None
+
+
+def get_package_index() -> PackageIndex:
+    global _package_index
+    if _package_index is None:
+        _package_index = PackageIndex.from_csv(os.getenv("CATALOG_PATH", DEFAULT_CATALOG_PATH))
+    return _package_index
+
+
+# Benchmark: python -m models.catalog.search [rows]
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    places = ["kerala", "goa", "manali", "jaipur", "udaipur", "leh", "rishikesh", "darjeeling", "ooty", "varanasi",
+              "andaman", "coorg", "munnar", "shimla", "agra", "hampi", "kutch", "sikkim", "meghalaya", "kashmir"]
+    words = ["fort", "palace", "beach", "trek", "temple", "safari", "lake", "houseboat", "desert", "camel", "rafting",
+             "monastery", "tea", "garden", "waterfall", "snorkeling", "heritage", "walk", "sunset", "cruise"]
+    categories = ["Adventure", "Nature", "Heritage", "Spiritual", "Leisure", "Wildlife", "Beach", "Cultural"]
+    rng = random.Random(0)
+
+    def synthetic():
+        for i in range(rows):
+            yield {
+                "name": f"{rng.choice(places).title()} {rng.choice(words).title()} Escape {i}",
+                "category": rng.choice(categories),
+                "highlights": " ".join(rng.sample(words, 4) + rng.sample(places, 2)),
+                "duration": str(rng.randint(2, 14)),
+                "price": str(rng.randrange(3000, 150000, 500)),
+            }
+
+    start = time.perf_counter()
+    index = PackageIndex(synthetic())
+    print(f"Indexed {len(index):,} packages in {time.perf_counter() - start:.1f}s")
+
+    queries = [
+        {"text": "kerala houseboat"},
+        {"text": "heritage fort palace", "max_days": 4, "max_price": 15000},
+        {"category": "Heritage", "min_days": 4, "max_days": 4, "max_price": 15000},
+        {"text": "leh monastery trek", "category": "Adventure"},
+        parse_query("a 4-day heritage trip under ₹15000"),
+    ]
+    for query in queries:
+        query = dict(query)
+        if "days" in query:
+            query["min_days"] = query["max_days"] = query.pop("days")
+        runs = 200
+        start = time.perf_counter()
+        for _ in range(runs):
+            result = index.search(**query, limit=20)
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{elapsed * 1000:7.3f} ms  {result['total']:>8,} hits  {query}")
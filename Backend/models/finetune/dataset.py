@@ -0,0 +1,254 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from tokens import count_tokens
+
+REQUIRED_COLUMNS = ("name", "category", "highlights", "duration", "price")
+SYSTEM_PROMPT = "You are a helpful travel planner AI. Provide detailed day-by-day itineraries."
+# chat: messages ending with the assistant reply (what OpenAI chat fine-tuning expects)
+# messages: system/user messages plus a separate "completion"
+# completion: legacy prompt/completion pairs
+FORMATS = ("chat", "messages", "completion")
+# Per-message overhead of the chat format, on top of the content tokens
+MESSAGE_TOKENS = 4
+
+
+def validate_row(row: Dict[str, str]) -> Optional[str]:
+    """Return why a CSV row can't become an example, or None if it's fine."""
+    for column in REQUIRED_COLUMNS:
+        if not (row.get(column) or "").strip():
+            return f"missing {column}"
+    try:
+        if int(row["duration"]) <= 0:
+            return "bad duration"
+    except ValueError:
+        return "bad duration"
+    price = row["price"].replace(",", "").strip()
+    if price.upper() != "N/A":
+        try:
+            float(price)
+        except ValueError:
+            return "bad price"
+    return None
+
+
+def build_example(row: Dict[str, str], fmt: str = "chat") -> Dict:
+    name, category = row["name"].strip(), row["category"].strip().title()
+    completion = (
+        f"Highlights: {row['highlights'].strip()}\n"
+        f"Duration: {int(row['duration'])} days\n"
+        f"Price: ₹{row['price'].strip()}\n"
+    )
+    if fmt == "completion":
+        return {"prompt": f"Create a detailed trip itinerary for {name} ({category}):\n\n", "completion": completion}
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"What is the itinerary for {name} ({category})?"},
+    ]
+    if fmt == "messages":
+        return {"messages": messages, "completion": completion}
+    return {"messages": messages + [{"role": "assistant", "content": completion}]}
+
+
+def example_tokens(example: Dict) -> int:
+    if "prompt" in example:
+        return count_tokens(example["prompt"]) + count_tokens(example["completion"])
+    tokens = sum(count_tokens(message["content"]) + MESSAGE_TOKENS for message in example["messages"])
+    if "completion" in example:
+        tokens += count_tokens(example["completion"])
+    return tokens
+
+
+def row_hash(row: Dict[str, str]) -> bytes:
+    """Content hash of the fields that make up an example; case/whitespace-insensitive."""
+    key = "\x1f".join(" ".join((row.get(column) or "").lower().split()) for column in REQUIRED_COLUMNS)
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=12).digest()
+
+
+class ShardWriter:
+    """
+    Writes JSONL lines to <prefix>-00000.jsonl, <prefix>-00001.jsonl, ...
+    rolling over at `max_bytes`. finish() renames a lone shard to
+    <prefix>.jsonl, the name the old conversion scripts wrote.
+    """
+
+    def __init__(self, prefix: str, max_bytes: int = 100 * 1024 * 1024):
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.paths = []
+        self._file = None
+        self._size = 0
+
+    def write(self, line: str):
+        data = (line + "\n").encode("utf-8")
+        if self._file is None or (self._size and self._size + len(data) > self.max_bytes):
+            self._roll()
+        self._file.write(data)
+        self._size += len(data)
+
+    def _roll(self):
+        self.close()
+        path = f"{self.prefix}-{len(self.paths):05d}.jsonl"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "wb", buffering=1024 * 1024)
+        self._size = 0
+        self.paths.append(path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        self.close()
+        if len(self.paths) == 1:
+            path = f"{self.prefix}.jsonl"
+            os.replace(self.paths[0], path)
+            self.paths = [path]
+
+
+class DedupeIndex:
+    """
+    Row hashes seen so far, in a temporary SQLite file.
+
+    A Python set costs ~80 bytes per entry (about 80 MB per million unique
+    rows); here memory is capped by `cache_mb` and the rest lives on disk
+    (~40 bytes per row). The file is deleted on close.
+    """
+
+    def __init__(self, cache_mb: int = 64):
+        fd, self.path = tempfile.mkstemp(prefix="dedupe-", suffix=".db")
+        os.close(fd)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(f"PRAGMA cache_size=-{cache_mb * 1024}")
+        self._conn.execute("CREATE TABLE seen (hash BLOB PRIMARY KEY) WITHOUT ROWID")
+
+    def add(self, digest: bytes) -> bool:
+        """True if the hash is new."""
+        return self._conn.execute("INSERT OR IGNORE INTO seen VALUES (?)", (digest,)).rowcount == 1
+
+    def close(self):
+        self._conn.close()
+        os.remove(self.path)
+
+
+def read_rows(csv_path: str) -> Iterator[Dict[str, str]]:
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{csv_path} is missing columns: {', '.join(missing)}")
+        yield from reader
+
+
+def build_dataset(
+    rows: Iterable[Dict[str, str]],
+    output_prefix: str,
+    fmt: str = "chat",
+    shard_bytes: int = 100 * 1024 * 1024,
+    max_tokens: Optional[int] = None,
+    dedupe: bool = True,
+    report_every: int = 100_000,
+) -> Dict:
+    """
+    Stream CSV rows into chat-format JSONL shards.
+
+    Rows are read and written one at a time, and the hashes used for
+    deduplication go to an on-disk DedupeIndex, so memory stays bounded
+    however big the CSV is. Rows that fail validation, repeat an earlier row, or exceed `max_tokens`
+    are skipped and counted in the returned stats.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    writer = ShardWriter(output_prefix, shard_bytes)
+    seen = DedupeIndex() if dedupe else None
+    skipped: Counter = Counter()
+    stats = {"rows": 0, "written": 0, "tokens": 0, "max_tokens": 0}
+    start = time.perf_counter()
+    try:
+        for row in rows:
+            stats["rows"] += 1
+            problem = validate_row(row)
+            if problem:
+                skipped[problem] += 1
+                continue
+            if dedupe:
+                if not seen.add(row_hash(row)):
+                    skipped["duplicate"] += 1
+                    continue
+            example = build_example(row, fmt)
+            tokens = example_tokens(example)
+            if max_tokens and tokens > max_tokens:
+                skipped["too many tokens"] += 1
+                continue
+            writer.write(json.dumps(example, ensure_ascii=False))
+            stats["written"] += 1
+            stats["tokens"] += tokens
+            stats["max_tokens"] = max(stats["max_tokens"], tokens)
+            if report_every and stats["rows"] % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {stats['rows']:,} rows ({stats['rows'] / elapsed:,.0f} rows/s)", file=sys.stderr)
+    finally:
+        writer.finish()
+        if seen is not None:
+            seen.close()
+    stats["elapsed"] = time.perf_counter() - start
+    stats["rows_per_sec"] = stats["rows"] / stats["elapsed"] if stats["elapsed"] else 0.0
+    stats["skipped"] = dict(skipped)
+    stats["shards"] = writer.paths
+    return stats
+
+
+def print_report(stats: Dict):
+    print(f"Read {stats['rows']:,} rows in {stats['elapsed']:.2f}s ({stats['rows_per_sec']:,.0f} rows/s)")
+    print(f"Wrote {stats['written']:,} examples to {len(stats['shards'])} shard(s)")
+    if stats["written"]:
+        print(f"Tokens: {stats['tokens']:,} total, {stats['tokens'] / stats['written']:.1f} avg, {stats['max_tokens']} max")
+    for reason, count in sorted(stats["skipped"].items()):
+        print(f"  skipped {count:,}: {reason}")
+    for path in stats["shards"]:
+        print(f"  {path}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Build fine-tuning JSONL from the trip planner CSV.")
+    parser.add_argument("csv", nargs="?", default=os.path.join(here, "trip_planner.csv"), help="input CSV")
+    parser.add_argument("-o", "--output", default="trip_planner", help="output prefix; <prefix>.jsonl, or <prefix>-00000.jsonl, ... when sharded")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="chat")
+    parser.add_argument("--shard-mb", type=float, default=100, help="max shard size in MB")
+    parser.add_argument("--max-tokens", type=int, default=None, help="skip examples longer than this")
+    parser.add_argument("--no-dedupe", action="store_true", help="keep duplicate rows")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> Dict:
+    args = parse_args(argv)
+    stats = build_dataset(
+        read_rows(args.csv),
+        args.output,
+        fmt=args.format,
+        shard_bytes=int(args.shard_mb * 1024 * 1024),
+        max_tokens=args.max_tokens,
+        dedupe=not args.no_dedupe,
+    )
+    print_report(stats)
+    return stats
+
+
+# Run from Backend/: python -m models.finetune.dataset [trip_planner.csv] -o data/trip_planner -f chat
+if __name__ == "__main__":
+    main()
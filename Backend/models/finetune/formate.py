@@ -1,41 +1,14 @@
-from langchain_openai import ChatOpenAI
+import asyncio
+import json
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field
-from typing import List
-
-load_dotenv()
-
-# Initialize the model
-model = ChatOpenAI(model="gpt-4o-mini-2024-07-18")
-
-# Define schema compatible with OpenAI's structured output
-class Review(BaseModel):
-    day1_date: str = Field(..., description="Date for Day 1 in YYYY-MM-DD format")
-    day1_activities: List[str] = Field(..., description="List of all activities for Day 1")
-    
-    day2_date: str = Field(..., description="Date for Day 2 in YYYY-MM-DD format") 
-    day2_activities: List[str] = Field(..., description="List of all activities for Day 2")
-    
-    day3_date: str = Field(..., description="Date for Day 3 in YYYY-MM-DD format")
-    day3_activities: List[str] = Field(..., description="List of all activities for Day 3")
-
-# Apply structured output with function_calling method
-structured_model = model.with_structured_output(Review, method="function_calling")
 
-# Enhanced prompt to ensure better day-wise grouping
-enhanced_prompt = """
-Please extract the itinerary information and organize it by days. For each day, group ALL activities that happen on that specific day together.
+from models.finetune.structure import parse_days, structure_itinerary
 
-Structure the response as:
-- Day1: All activities happening on the first day 
-- Day2: All activities happening on the second day 
-- Day3: All activities happening on the third day 
-so on
-
-Make sure each activity is listed under the correct day, regardless of what time of day it occurs.
+load_dotenv()
 
-Here's the itinerary data:
-"""
+# Itineraries are grouped by day in-process (any number of days); the
+# schema-constrained LLM extraction in structure.py only runs when the parse
+# looks wrong. Run from Backend/: python -m models.finetune.formate
 
 # Input data
 data = """
@@ -155,39 +128,11 @@ Sure! Here’s a detailed day-by-day itinerary for your trip to Manali, keeping
 Enjoy your trip to Manali!
 """
 
-# Combine prompt and data
-full_input = enhanced_prompt + data
+structured, confidence = parse_days(data)
+print(f"Parse confidence: {confidence:.2f}")
 
-# 🛠️ Pass the input to `.invoke()`
-result = structured_model.invoke(full_input)
-result_json = result.model_dump_json(indent=2)
-
-# Print the structured output
-print("Structured Output:")
-print(result_json)
-
-# Convert to your desired format
-import json
-result_dict = json.loads(result_json)
-
-# Transform to day-wise dictionary format
-formatted_output = {
-    "days": {
-        "Day1": {
-            "date": result_dict["day1_date"],
-            "activities": result_dict["day1_activities"]
-        },
-        "Day2": {
-            "date": result_dict["day2_date"], 
-            "activities": result_dict["day2_activities"]
-        },
-        "Day3": {
-            "date": result_dict["day3_date"],
-            "activities": result_dict["day3_activities"]
-        }
-    }
-}
+formatted_output = asyncio.run(structure_itinerary(data))
 
 print("\n" + "="*50)
 print("Formatted Output:")
-print(json.dumps(formatted_output, indent=2))
\ No newline at end of file
+print(json.dumps(formatted_output, indent=2))
@@ -1,39 +1,48 @@
 import openai
 import os
 from dotenv import load_dotenv
-from typing import Dict, Annotated, Optional, Literal
+from typing import AsyncIterator, Dict, List, Annotated, Optional, Literal
 from pydantic import BaseModel, Field
+from llm_client import FINE_TUNED_MODEL, complete, get_llm_client
+from itinerary_cache import make_cache_key
+from models.catalog.retrieval import corpus_version, reference_itineraries
 # Load environment variables from .env
 load_dotenv()
 
-# Set OpenAI API key
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
 # Use fine-tuned model or fallback
 # fine_tune_model = os.getenv("FINE_TUNE_MODEL")
 
+# Bump whenever the prompt below changes so cached itineraries are not reused
+PROMPT_VERSION = "2"
+
+REQUIRED_FIELDS = ['destination', 'budget', 'days', 'startDate', 'endDate', 'transport', 'requirement']
+MAX_TOKENS = 2000
+# Prompt tokens spent on reference itineraries from the scraped catalog
+CONTEXT_TOKENS = int(os.getenv("ITINERARY_CONTEXT_TOKENS", "400"))
+
 class ItineraryRequest(BaseModel):
     days: int = Field(..., ge=1, description="Number of days for the trip")
     
 
-def generate_itinerary(data: Dict) -> Dict:
+def itinerary_cache_key(data: Dict) -> str:
+    """
+    Cache key for a trip request under the current model and prompt. The prompt
+    includes reference itineraries, so a reloaded corpus means new keys too.
     """
-    Generate an itinerary using OpenAI ChatCompletion API.
+    return make_cache_key(data, FINE_TUNED_MODEL, f"{PROMPT_VERSION}:{corpus_version()}")
 
-    Args:
-        data (dict): Input data including destination, budget, days, etc.
 
-    Returns:
-        dict: A response containing the itinerary or an error message.
-    """
-    try:
-        # Validate required fields
-        required_fields = ['destination', 'budget', 'days', 'startDate', 'endDate', 'transport', 'requirement']
-        for field in required_fields:
-            if not data.get(field):
-                return {"error": f"Missing required field: {field}"}
+def missing_field(data: Dict) -> Optional[str]:
+    """Return the first required field that is empty, if any."""
+    for field in REQUIRED_FIELDS:
+        if not data.get(field):
+            return field
+    return None
+
 
-        prompt = f"""
+def build_messages(data: Dict) -> List[Dict]:
+    """Chat messages for the fine-tuned itinerary model."""
+    prompt = f"""
 Create a detailed day-by-day itinerary for:
 - Destination: {data.get('destination')}
 - Budget: ₹ {data.get('budget')}
@@ -54,29 +63,70 @@ Please include:
 
 
 """
-        response = openai.ChatCompletion.create(
-            model="ft:gpt-4o-mini-2024-07-18:personal:ai-trip-planner-final:BTKhoUKU",
-            messages=[
-                {"role": "system", "content": "You are an AI travel assistant specializing in creating detailed, personalized travel itineraries."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2000,
+    references = reference_itineraries(data.get('destination') or "", data.get('requirement') or "", CONTEXT_TOKENS)
+    if references:
+        prompt += references + "\n"
+    return [
+        {"role": "system", "content": "You are an AI travel assistant specializing in creating detailed, personalized travel itineraries."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def describe_error(e: Exception) -> str:
+    """User-facing message for an OpenAI failure."""
+    if isinstance(e, openai.AuthenticationError):
+        return "OpenAI API authentication failed. Please check your API key."
+    if isinstance(e, openai.RateLimitError):
+        return "OpenAI API rate limit exceeded. Please try again later."
+    return f"Failed to generate itinerary: {str(e)}"
+
+
+async def generate_itinerary(data: Dict) -> Dict:
+    """
+    Generate an itinerary with the fine-tuned model via the shared async LLM client.
+
+    Args:
+        data (dict): Input data including destination, budget, days, etc.
+
+    Returns:
+        dict: A response containing the itinerary or an error message.
+    """
+    try:
+        # Validate required fields
+        field = missing_field(data)
+        if field:
+            return {"error": f"Missing required field: {field}"}
+
+        reply = await complete(
+            model=FINE_TUNED_MODEL,
+            messages=build_messages(data),
+            max_tokens=MAX_TOKENS,
             temperature=0.7
         )
-        reply = response.choices[0].message["content"].strip()
-        
-        
         return {"itinerary": reply}
-    except openai.error.AuthenticationError:
-        return {"error": "OpenAI API authentication failed. Please check your API key."}
-    except openai.error.RateLimitError:
-        return {"error": "OpenAI API rate limit exceeded. Please try again later."}
     except Exception as e:
-        print("OpenAI Error:", e)
-        return {"error": f"Failed to generate itinerary: {str(e)}"}
+        if not isinstance(e, (openai.AuthenticationError, openai.RateLimitError)):
+            print("OpenAI Error:", e)
+        return {"error": describe_error(e)}
+
+
+async def stream_itinerary(data: Dict) -> AsyncIterator[str]:
+    """
+    Stream an itinerary from the fine-tuned model as text deltas.
+
+    Callers should check missing_field() first; OpenAI errors propagate and can
+    be turned into a message with describe_error().
+    """
+    async for delta in get_llm_client().stream(
+        model=FINE_TUNED_MODEL,
+        messages=build_messages(data),
+        max_tokens=MAX_TOKENS,
+        temperature=0.7
+    ):
+        yield delta
 
 
-# print(generate_itinerary({
+# print(asyncio.run(generate_itinerary({
 #     "destination": "Manali",
 #     "budget": 25000,
 #     "days": 4,
@@ -85,4 +135,4 @@ Please include:
 #     "transport": "Train",
 #     "requirement": "Include adventure sports and nature spots",
 #     "child": False
-# }))
\ No newline at end of file
+# })))
\ No newline at end of file
@@ -0,0 +1,97 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from llm_client import get_llm_client
+from models.Agent.itinerary_parser import ItineraryParser
+
+# Below this the deterministic parse is not trusted and the LLM fallback runs
+MIN_CONFIDENCE = 0.8
+DAY_NUMBER_RE = re.compile(r"^day\s*(\d+)", re.IGNORECASE)
+ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class DayPlan(BaseModel):
+    day: int = Field(..., description="Day number, starting at 1")
+    date: str = Field(..., description="Date for the day in YYYY-MM-DD format, or empty if unknown")
+    activities: List[str] = Field(..., description="List of all activities for the day")
+
+
+class StructuredItinerary(BaseModel):
+    days: List[DayPlan] = Field(..., description="One entry per day of the trip, in order")
+
+
+def _activity_text(activity: Dict) -> str:
+    time, description = activity["time"], activity["description"].replace("**", "")
+    if time and description:
+        return f"{time}: {description}"
+    return time or description
+
+
+def parse_days(text: str, expected_days: Optional[int] = None) -> Tuple[Dict, float]:
+    """
+    Deterministically group itinerary text by day.
+
+    Returns ({"days": {"Day1": {"date", "activities"}, ...}}, confidence). The
+    confidence is a weighted score of sanity checks: the day count matches
+    `expected_days`, day numbers run 1..N, every day has activities, and every
+    day has a date when any day does. No days at all scores 0.
+    """
+    parser = ItineraryParser()
+    events = parser.feed(text) + parser.close()
+    if not parser.result["days"]:
+        return {"days": {}}, 0.0
+
+    days = {}
+    for day in parser.result["days"]:
+        iso = ISO_DATE_RE.search(day.get("date", ""))
+        days[f"Day{len(days) + 1}"] = {"date": iso.group(0) if iso else day.get("date", ""), "activities": []}
+    # Events keep document order, which section dicts don't
+    for event in events:
+        if event["type"] == "activity":
+            days[f"Day{event['index'] + 1}"]["activities"].append(_activity_text(event["activity"]))
+
+    numbers = []
+    for day in parser.result["days"]:
+        match = DAY_NUMBER_RE.match(day["day"])
+        numbers.append(int(match.group(1)) if match else None)
+    dated = [bool(day["date"]) for day in days.values()]
+
+    checks = [
+        (0.2, numbers == list(range(1, len(numbers) + 1))),
+        (0.25, all(day["activities"] for day in days.values())),
+        (0.15, all(dated) or not any(dated)),
+    ]
+    if expected_days is not None:
+        checks.append((0.4, len(days) == expected_days))
+    confidence = sum(weight for weight, ok in checks if ok) / sum(weight for weight, _ in checks)
+    return {"days": days}, confidence
+
+
+async def extract_days(text: str) -> Dict:
+    """Schema-constrained LLM extraction, for text the parser can't make sense of."""
+    result = await get_llm_client().parse(
+        messages=[
+            {"role": "system", "content": "Extract the itinerary and organize it by days. "
+                                          "List every activity under the day it happens on, regardless of time of day."},
+            {"role": "user", "content": text},
+        ],
+        response_format=StructuredItinerary,
+        model="gpt-4o-mini-2024-07-18",
+        temperature=0,
+    )
+    return {
+        "days": {
+            f"Day{index + 1}": {"date": day.date, "activities": day.activities}
+            for index, day in enumerate(sorted(result.days, key=lambda d: d.day))
+        }
+    }
+
+
+async def structure_itinerary(text: str, expected_days: Optional[int] = None) -> Dict:
+    """Day-indexed structure for an itinerary of any length; only calls the LLM on a low-confidence parse."""
+    structured, confidence = parse_days(text, expected_days)
+    if confidence >= MIN_CONFIDENCE:
+        return structured
+    return await extract_days(text)
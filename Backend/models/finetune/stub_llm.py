@@ -0,0 +1,48 @@
+# Minimal OpenAI-compatible chat endpoint for running the generators offline.
+# Run from Backend/: uvicorn models.finetune.stub_llm:app --port 8001
+import asyncio
+import os
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+
+app = FastAPI()
+
+# Simulated model latency in seconds
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", "0.2"))
+
+
+def fake_itinerary(days: int) -> str:
+    lines = []
+    for day in range(1, days + 1):
+        lines += [
+            f"### Day {day}: Sightseeing",
+            "- **9:00 AM**: Breakfast at the hotel (₹300)",
+            "- **11:00 AM**: Visit the main attractions (₹500)",
+            "- **7:00 PM**: Dinner at a local restaurant (₹600)",
+            "",
+        ]
+    lines += ["### Cost Breakdown", f"- **Activities**: ₹{days * 1400}"]
+    return "\n".join(lines)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = body["messages"][-1]["content"]
+    match = re.search(r"Duration:\s*(\d+)", prompt) or re.search(r"(\d+)-day", prompt)
+    content = fake_itinerary(int(match.group(1)) if match else 3)
+    await asyncio.sleep(STUB_LATENCY)
+    prompt_tokens = sum(len(m["content"]) // 4 for m in body["messages"])
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
@@ -0,0 +1,286 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from llm_client import CHAT_MODEL, LLMClient
+from models.finetune.dataset import ShardWriter, read_rows, row_hash, validate_row
+from models.finetune.generate_itinerary import build_messages
+from models.finetune.structure import MIN_CONFIDENCE, parse_days
+
+GENERATOR_PROMPT = """
+Write a realistic day-by-day itinerary for the tour package below, answering the traveller's request.
+
+- Package: {name}
+- Category: {category}
+- Highlights: {highlights}
+- Duration: {duration} days
+- Approximate price: ₹{price} per person
+
+Format it in markdown with exactly {duration} days. Start each day with a heading like
+"### Day 1: <title>", then bullets such as "- **9:00 AM**: <activity>" covering morning,
+afternoon and evening, with costs in INR. End with a "### Cost Breakdown" section.
+
+The traveller's request:
+{request}
+"""
+
+# Values the trip form can send (Frontend Form.jsx)
+TRANSPORTS = ("bus", "train", "flight")
+TRAVEL_STYLES = ("luxury", "budget")
+FIRST_START_DATE = date(2025, 1, 1)
+
+
+def package_price(row: Dict[str, str]) -> Optional[float]:
+    price = row["price"].replace(",", "").strip()
+    return None if price.upper() == "N/A" else float(price)
+
+
+def trip_request(row: Dict[str, str]) -> Dict:
+    """
+    The /trip/itinerary payload a traveller could send for this package.
+
+    Dates, transport, style and children are spread across the form's values
+    with the row hash, so reruns produce the same request for the same row.
+    """
+    digest = row_hash(row)
+    days = int(row["duration"])
+    start = FIRST_START_DATE + timedelta(days=int.from_bytes(digest[:2], "big") % 365)
+    return {
+        "destination": row["name"].strip(),
+        "budget": package_price(row),
+        "days": days,
+        "startDate": start.isoformat(),
+        "endDate": (start + timedelta(days=days - 1)).isoformat(),
+        "transport": TRANSPORTS[digest[2] % len(TRANSPORTS)],
+        "requirement": TRAVEL_STYLES[digest[3] % len(TRAVEL_STYLES)],
+        "child": bool(digest[4] % 2),
+    }
+
+
+class SynthesisCheckpoint:
+    """
+    Generated examples in SQLite, keyed by the row's content hash.
+
+    Every example is committed as soon as it comes back, so a run that is
+    interrupted picks up where it stopped: rows with an example are skipped and
+    only missing or failed ones are generated again.
+    """
+
+    def __init__(self, path: str = "./synthesize_checkpoint.db"):
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS examples (
+                row_hash BLOB PRIMARY KEY,
+                position INTEGER NOT NULL,
+                example TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                latency REAL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                confidence REAL,
+                created_at REAL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def is_done(self, digest: bytes) -> bool:
+        row = self._conn.execute("SELECT 1 FROM examples WHERE row_hash = ? AND example IS NOT NULL", (digest,)).fetchone()
+        return row is not None
+
+    def save(self, digest: bytes, position: int, example: Optional[Dict], error: Optional[str], attempts: int,
+             latency: float, prompt_tokens: int, completion_tokens: int, confidence: float):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO examples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (digest, position, json.dumps(example, ensure_ascii=False) if example else None, error, attempts,
+             latency, prompt_tokens, completion_tokens, confidence, time.time()),
+        )
+        self._conn.commit()
+
+    def examples(self) -> Iterable[str]:
+        for row in self._conn.execute("SELECT example FROM examples WHERE example IS NOT NULL ORDER BY position"):
+            yield row["example"]
+
+    def summary(self) -> Dict:
+        rows = self._conn.execute(
+            "SELECT latency, prompt_tokens, completion_tokens, example IS NOT NULL AS ok FROM examples"
+        ).fetchall()
+        latencies = sorted(row["latency"] for row in rows if row["ok"] and row["latency"] is not None)
+        summary = {
+            "examples": sum(row["ok"] for row in rows),
+            "failed": sum(not row["ok"] for row in rows),
+            "prompt_tokens": sum(row["prompt_tokens"] or 0 for row in rows),
+            "completion_tokens": sum(row["completion_tokens"] or 0 for row in rows),
+        }
+        if latencies:
+            summary["latency_p50"] = statistics.median(latencies)
+            summary["latency_p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return summary
+
+    def close(self):
+        self._conn.close()
+
+
+async def generate_example(client: LLMClient, row: Dict[str, str], model: str, retries: int = 1) -> Dict:
+    """
+    Generate one chat-format example for a catalog row.
+
+    The reply is checked with structure.parse_days; one that doesn't have the
+    row's number of days is regenerated up to `retries` times. Returns the
+    example (or None), the error, attempts, latency and token usage.
+    """
+    duration = int(row["duration"])
+    # Exactly the messages the app sends the fine-tuned model for this request
+    prompt = build_messages(trip_request(row))
+    system, request = prompt[0], prompt[-1]["content"]
+    messages = [system, {"role": "user", "content": GENERATOR_PROMPT.format(
+        duration=duration, request=request.strip(),
+        **{k: row[k].strip() for k in ("name", "category", "highlights", "price")},
+    )}]
+    result = {"example": None, "error": None, "attempts": 0, "latency": 0.0,
+              "prompt_tokens": 0, "completion_tokens": 0, "confidence": 0.0}
+    for _ in range(retries + 1):
+        result["attempts"] += 1
+        start = time.perf_counter()
+        try:
+            response = await client.create(messages, model=model, temperature=0.7)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            continue
+        finally:
+            result["latency"] += time.perf_counter() - start
+        if response.usage:
+            result["prompt_tokens"] += response.usage.prompt_tokens
+            result["completion_tokens"] += response.usage.completion_tokens
+        text = (response.choices[0].message.content or "").strip()
+        _, result["confidence"] = parse_days(text, duration)
+        if result["confidence"] >= MIN_CONFIDENCE:
+            result["error"] = None
+            result["example"] = {"messages": prompt + [{"role": "assistant", "content": text}]}
+            break
+        result["error"] = f"itinerary did not have {duration} well-formed days (confidence {result['confidence']:.2f})"
+    return result
+
+
+async def synthesize(
+    rows: Iterable[Dict[str, str]],
+    checkpoint: SynthesisCheckpoint,
+    client: LLMClient,
+    model: str = CHAT_MODEL,
+    concurrency: int = 8,
+    retries: int = 1,
+) -> Dict:
+    """
+    Generate examples for every valid, unseen row with `concurrency` workers.
+
+    Rows are streamed into a bounded queue so only a few are held in memory.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"generated": 0, "failed": 0, "resumed": 0, "skipped": 0}
+    start = time.perf_counter()
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            position, digest, row = item
+            result = await generate_example(client, row, model, retries)
+            checkpoint.save(digest, position, result["example"], result["error"], result["attempts"],
+                            result["latency"], result["prompt_tokens"], result["completion_tokens"], result["confidence"])
+            if result["example"]:
+                stats["generated"] += 1
+            else:
+                stats["failed"] += 1
+                print(f"Failed {row['name']!r}: {result['error']}")
+            done = stats["generated"] + stats["failed"]
+            if done % 50 == 0:
+                print(f"  {done:,} generated ({done / (time.perf_counter() - start):.1f} examples/s)")
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        seen = set()
+        for position, row in enumerate(rows):
+            # The app always sends a budget, so packages without a price can't be asked for
+            if validate_row(row) or package_price(row) is None:
+                stats["skipped"] += 1
+                continue
+            digest = row_hash(row)
+            if digest in seen:
+                stats["skipped"] += 1
+                continue
+            seen.add(digest)
+            if checkpoint.is_done(digest):
+                stats["resumed"] += 1
+                continue
+            await queue.put((position, digest, row))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Generate real itineraries for the catalog as fine-tuning examples.")
+    parser.add_argument("csv", nargs="?", default=os.path.join(here, "trip_planner.csv"), help="input CSV")
+    parser.add_argument("-o", "--output", default="trip_planner_synthetic", help="output prefix; <prefix>.jsonl, or <prefix>-00000.jsonl, ... when sharded")
+    parser.add_argument("--checkpoint", default="./synthesize_checkpoint.db")
+    parser.add_argument("--model", default=os.getenv("SYNTH_MODEL", CHAT_MODEL))
+    parser.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL"), help="OpenAI-compatible endpoint, e.g. a local stub")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--retries", type=int, default=1, help="regenerations when an itinerary is malformed")
+    parser.add_argument("--shard-mb", type=float, default=100)
+    return parser.parse_args(argv)
+
+
+async def main(argv=None) -> Dict:
+    args = parse_args(argv)
+    # A local stub doesn't check the key, but the client insists on one
+    api_key = os.getenv("OPENAI_API_KEY") or ("stub" if args.base_url else None)
+    client = LLMClient(api_key=api_key, base_url=args.base_url, max_concurrency=args.concurrency,
+                       max_connections=args.concurrency)
+    checkpoint = SynthesisCheckpoint(args.checkpoint)
+    try:
+        stats = await synthesize(read_rows(args.csv), checkpoint, client, args.model, args.concurrency, args.retries)
+        writer = ShardWriter(args.output, int(args.shard_mb * 1024 * 1024))
+        try:
+            for line in checkpoint.examples():
+                writer.write(line)
+        finally:
+            writer.finish()
+        summary = checkpoint.summary()
+    finally:
+        checkpoint.close()
+        await client.aclose()
+
+    print(f"Generated {stats['generated']} ({stats['failed']} failed), resumed past {stats['resumed']}, "
+          f"skipped {stats['skipped']} invalid/duplicate rows in {stats['elapsed']:.1f}s")
+    print(f"Checkpoint: {summary['examples']} examples, {summary['failed']} failed, "
+          f"{summary['prompt_tokens']:,} prompt + {summary['completion_tokens']:,} completion tokens")
+    if "latency_p50" in summary:
+        print(f"Latency per example: p50 {summary['latency_p50']:.2f}s, p95 {summary['latency_p95']:.2f}s")
+    for path in writer.paths:
+        print(f"  {path}")
+    return {**stats, **summary}
+
+
+# Run from Backend/: python -m models.finetune.synthesize [trip_planner.csv] -c 16
+# Against the stub: uvicorn models.finetune.stub_llm:app --port 8001 &
+#                   python -m models.finetune.synthesize --base-url http://127.0.0.1:8001/v1
+if __name__ == "__main__":
+    asyncio.run(main())
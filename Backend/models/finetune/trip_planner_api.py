@@ -2,8 +2,8 @@
 
 from fastapi import FastAPI
 from pydantic import BaseModel
-import openai
 from fastapi.middleware.cors import CORSMiddleware
+from llm_client import FINE_TUNED_MODEL, complete, close_llm_client
 
 app = FastAPI()
 
@@ -15,9 +15,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-openai.api_key = "OPENAI_API_KEY"
-
-MODEL_NAME = "ft:gpt-4o-mini-2024-07-18:personal:ai-trip-planner-final:BTKhoUKU"
+MODEL_NAME = FINE_TUNED_MODEL
 
 class TripRequest(BaseModel):
     location: str
@@ -34,11 +32,11 @@ def generate_prompt(location: str, duration: int, category: str | None = None) -
     return prompt
 
 @app.post("/generate-itinerary")
-def generate_itinerary(data: TripRequest):
+async def generate_itinerary(data: TripRequest):
     prompt = generate_prompt(data.location, data.duration, data.category)
 
     try:
-        response = openai.chat.completions.create(
+        itinerary = await complete(
             model=MODEL_NAME,
             messages=[
                 {"role": "system", "content": "You are a helpful travel planner AI. Provide detailed day-by-day itineraries."},
@@ -47,9 +45,13 @@ def generate_itinerary(data: TripRequest):
             temperature=0.7
         )
 
-        return {"itinerary": response.choices[0].message.content.strip()}
+        return {"itinerary": itinerary}
 
     except Exception as e:
         return {"error": str(e)}
 
-# Run : uvicorn trip_planner_api:app --reload
+@app.on_event("shutdown")
+async def shutdown_clients():
+    await close_llm_client()
+
+# Run from Backend/ : uvicorn models.finetune.trip_planner_api:app --reload
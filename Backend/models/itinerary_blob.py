@@ -0,0 +1,299 @@
+import hashlib
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Base
+from models.trip import Trip, utcnow
+
+try:
+    import zstandard
+except ImportError:  # zlib always works, zstd is just smaller and faster to read
+    zstandard = None
+
+ZSTD_LEVEL = int(os.getenv("ITINERARY_ZSTD_LEVEL", "9"))
+ZLIB_LEVEL = 9
+
+
+class ItineraryBlob(Base):
+    """One compressed itinerary body, shared by every trip with the same text."""
+
+    __tablename__ = "itinerary_blobs"
+    # content_hash() of the text
+    hash = Column(String(32), primary_key=True)
+    # "zlib", "zstd" or "zstd:<dictionary id>"
+    codec = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+
+
+class ItineraryDictionary(Base):
+    """zstd dictionaries trained on our itineraries; kept forever so old blobs stay readable."""
+
+    __tablename__ = "itinerary_dictionaries"
+    id = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class BlobCodec:
+    """
+    Compresses with zstd and the newest dictionary (zlib without zstandard);
+    decompresses whatever codec a blob was written with.
+    """
+
+    def __init__(self, dictionaries: Optional[Dict[int, bytes]] = None, level: int = ZSTD_LEVEL):
+        self.level = level
+        self.dictionaries: Dict[int, bytes] = {}
+        self._compressors: Dict[Optional[int], object] = {}
+        self._decompressors: Dict[Optional[int], object] = {}
+        for dictionary_id, data in (dictionaries or {}).items():
+            self.add_dictionary(dictionary_id, data)
+
+    def add_dictionary(self, dictionary_id: int, data: bytes):
+        self.dictionaries[dictionary_id] = data
+
+    @property
+    def current(self) -> Optional[int]:
+        return max(self.dictionaries) if self.dictionaries else None
+
+    def _zstd_dict(self, dictionary_id: Optional[int]):
+        return zstandard.ZstdCompressionDict(self.dictionaries[dictionary_id]) if dictionary_id else None
+
+    def compress(self, text: str) -> Tuple[str, bytes]:
+        raw = text.encode("utf-8")
+        if zstandard is None:
+            return "zlib", zlib.compress(raw, ZLIB_LEVEL)
+        dictionary_id = self.current
+        if dictionary_id not in self._compressors:
+            self._compressors[dictionary_id] = zstandard.ZstdCompressor(
+                level=self.level, dict_data=self._zstd_dict(dictionary_id)
+            )
+        codec = f"zstd:{dictionary_id}" if dictionary_id else "zstd"
+        return codec, self._compressors[dictionary_id].compress(raw)
+
+    def decompress(self, codec: str, data: bytes) -> str:
+        if codec == "zlib":
+            return zlib.decompress(data).decode("utf-8")
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd itineraries")
+        _, _, dictionary = codec.partition(":")
+        dictionary_id = int(dictionary) if dictionary else None
+        if dictionary_id not in self._decompressors:
+            self._decompressors[dictionary_id] = zstandard.ZstdDecompressor(dict_data=self._zstd_dict(dictionary_id))
+        return self._decompressors[dictionary_id].decompress(data).decode("utf-8")
+
+
+_codec: Optional[BlobCodec] = None
+
+
+async def get_codec(db: AsyncSession, refresh: bool = False) -> BlobCodec:
+    """Shared codec with every dictionary in the database."""
+    global _codec
+    if _codec is None or refresh:
+        rows = (await db.execute(select(ItineraryDictionary.id, ItineraryDictionary.data))).all()
+        _codec = BlobCodec({row.id: row.data for row in rows})
+    return _codec
+
+
+async def store_itinerary(db: AsyncSession, text: str) -> str:
+    """
+    Store an itinerary once and return its hash for Trip.blob_hash.
+
+    Identical bodies (the itinerary cache hands the same text to everyone who
+    asks for the same trip) are only compressed and written the first time.
+    """
+    digest = content_hash(text)
+    if await db.get(ItineraryBlob, digest) is None:
+        codec, data = (await get_codec(db)).compress(text)
+        try:
+            async with db.begin_nested():
+                db.add(ItineraryBlob(hash=digest, codec=codec, size=len(text.encode("utf-8")), data=data))
+        except IntegrityError:
+            pass  # a concurrent request stored it first
+    return digest
+
+
+async def _decompress(db: AsyncSession, codec_name: str, data: bytes) -> str:
+    codec = await get_codec(db)
+    if ":" in codec_name and int(codec_name.split(":")[1]) not in codec.dictionaries:
+        # Trained by another process since we loaded the dictionaries
+        codec = await get_codec(db, refresh=True)
+    return codec.decompress(codec_name, data)
+
+
+async def load_itinerary(db: AsyncSession, digest: str) -> Optional[str]:
+    blob = (await db.execute(
+        select(ItineraryBlob.codec, ItineraryBlob.data).where(ItineraryBlob.hash == digest)
+    )).first()
+    return await _decompress(db, blob.codec, blob.data) if blob else None
+
+
+async def open_trip(db: AsyncSession, trip_id: int) -> Optional[Tuple[Trip, str]]:
+    """
+    A trip and its decompressed itinerary in one query.
+
+    This is the only place bodies are decompressed; history pages never touch
+    itinerary_blobs.
+    """
+    row = (await db.execute(
+        select(Trip, ItineraryBlob.codec, ItineraryBlob.data)
+        .join(ItineraryBlob, ItineraryBlob.hash == Trip.blob_hash)
+        .where(Trip.id == trip_id)
+    )).first()
+    if row is None:
+        return None
+    return row.Trip, await _decompress(db, row.codec, row.data)
+
+
+def train_dictionary(samples: List[str], size: int = 64 * 1024) -> bytes:
+    return zstandard.train_dictionary(size, [sample.encode("utf-8") for sample in samples]).as_bytes()
+
+
+async def save_dictionary(db: AsyncSession, data: bytes) -> int:
+    """New blobs are compressed with the newest dictionary; existing ones keep theirs."""
+    dictionary = ItineraryDictionary(data=data)
+    db.add(dictionary)
+    await db.commit()
+    await get_codec(db, refresh=True)
+    return dictionary.id
+
+
+def synthetic_itinerary(rng, destination: str, days: int) -> str:
+    """LLM-shaped markdown for the benchmark: same structure, varying details."""
+    spots = ["Fort", "Lake", "Old Market", "Temple", "Museum", "Beach", "Viewpoint", "Gardens", "Palace", "Waterfall"]
+    foods = ["thali", "street food", "seafood", "local cafe", "rooftop dinner", "dhaba lunch"]
+    lines = [f"# Day-by-Day Itinerary for {destination} ({days} days)", "", f"A relaxed trip through {destination} with local food and sights.", ""]
+    for day in range(1, days + 1):
+        lines += [f"### Day {day}: Exploring {destination}", ""]
+        for slot in ("Morning", "Afternoon", "Evening"):
+            spot = rng.choice(spots)
+            lines += [
+                f"- **{slot}**: Visit the {destination} {spot}. Spend around {rng.randint(1, 3)} hours here; "
+                f"entry fee ₹{rng.randrange(50, 600, 50)}. Best visited early to avoid crowds.",
+                f"  - Food: try {rng.choice(foods)} nearby (₹{rng.randrange(200, 1500, 100)} for two).",
+                f"  - Transport: auto-rickshaw or cab, about ₹{rng.randrange(100, 800, 50)}.",
+            ]
+        lines.append("")
+    lines += ["### Cost Breakdown", ""]
+    for item in ("Accommodation", "Food", "Transport", "Activities"):
+        lines.append(f"- **{item}**: ₹{rng.randrange(2000, 30000, 500)}")
+    lines += ["", "### Important Considerations", "", "- Carry cash for small vendors.", "- Check weather before outdoor activities."]
+    return "\n".join(lines)
+
+
+# python -m models.itinerary_blob train [corpus] [dictionary bytes]   train a dictionary into DATABASE_URL
+# python -m models.itinerary_blob [trips]                             size / backup / read benchmark
+if __name__ == "__main__":
+    import asyncio
+    import random
+    import sqlite3
+    import sys
+    import tempfile
+    import time
+
+    from sqlalchemy import Text, func
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from sqlalchemy.orm import declarative_base
+
+    from database import SessionLocal, init_db, make_engine
+    from models.user import User
+
+    async def train():
+        corpus = sys.argv[2] if len(sys.argv) > 2 else "detailed_itineraries.txt"
+        size = int(sys.argv[3]) if len(sys.argv) > 3 else 64 * 1024
+        await init_db()
+        async with SessionLocal() as db:
+            rows = (await db.execute(select(ItineraryBlob.hash).order_by(ItineraryBlob.created_at.desc()).limit(5000))).all()
+            samples = [await load_itinerary(db, row.hash) for row in rows]
+            if os.path.exists(corpus):
+                with open(corpus, encoding="utf-8") as f:
+                    samples += [block for block in f.read().split("\n--- ") if block.strip()]
+            if len(samples) < 100:
+                print(f"Only {len(samples)} samples; need at least 100 itineraries to train a dictionary")
+                return
+            dictionary_id = await save_dictionary(db, train_dictionary(samples, size))
+            print(f"Trained dictionary {dictionary_id} ({size:,} bytes) on {len(samples):,} itineraries")
+
+    # The old layout: itinerary text inline on every trip row
+    InlineBase = declarative_base()
+
+    class InlineTrip(InlineBase):
+        __tablename__ = "trips"
+        id = Column(Integer, primary_key=True)
+        user_id = Column(Integer, nullable=False)
+        destination = Column(String, nullable=False)
+        request = Column(Text, nullable=False)
+        itinerary = Column(Text, nullable=False)
+
+    async def bench():
+        global _codec
+        total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+        rng = random.Random(0)
+        destinations = ["Goa", "Manali", "Jaipur", "Kerala", "Ladakh", "Udaipur", "Rishikesh", "Darjeeling"]
+        # Popular trips are repeats served from the itinerary cache; the rest are fresh generations
+        popular = [synthetic_itinerary(rng, d, days) for d in destinations for days in (3, 5, 7)]
+        texts = [rng.choice(popular) if rng.random() < 0.4 else
+                 synthetic_itinerary(rng, rng.choice(destinations), rng.choice((3, 5, 7, 10))) for _ in range(total)]
+        raw_bytes = sum(len(text.encode("utf-8")) for text in texts)
+        reads = [rng.randint(1, total) for _ in range(1000)]
+        directory = tempfile.mkdtemp()
+
+        async def build(name):
+            path = f"{directory}/{name}.db"
+            engine = make_engine(f"sqlite+aiosqlite:///{path}")
+            async with engine.begin() as conn:
+                await conn.run_sync(InlineBase.metadata.create_all if name == "inline" else Base.metadata.create_all)
+            sessions = async_sessionmaker(engine, expire_on_commit=False)
+            async with sessions() as db:
+                _codec = None
+                if name == "inline":
+                    db.add_all(InlineTrip(id=i, user_id=1, destination="x", request="{}", itinerary=text)
+                               for i, text in enumerate(texts, 1))
+                else:
+                    if name.endswith("+dict"):
+                        await save_dictionary(db, train_dictionary(texts[:500]))
+                    db.add(User(id=1, name="Bench", email="bench@example.com", password_hash="x"))
+                    for i, text in enumerate(texts, 1):
+                        db.add(Trip(id=i, user_id=1, destination="x", days=3, budget=1.0, start_date="", end_date="",
+                                    request="{}", blob_hash=await store_itinerary(db, text)))
+                await db.commit()
+                blobs = (await db.execute(select(func.count()).select_from(ItineraryBlob))).scalar() if name != "inline" else total
+
+                start = time.perf_counter()
+                for i in reads:
+                    if name == "inline":
+                        (await db.get(InlineTrip, i)).itinerary
+                    else:
+                        await open_trip(db, i)
+                    db.expunge_all()
+                read_ms = (time.perf_counter() - start) / len(reads) * 1000
+            await engine.dispose()
+
+            source = sqlite3.connect(path)
+            source.execute("VACUUM")
+            start = time.perf_counter()
+            target = sqlite3.connect(f"{directory}/{name}.backup.db")
+            source.backup(target)
+            target.close()
+            backup_ms = (time.perf_counter() - start) * 1000
+            source.close()
+            print(f"{name:>9}: {os.path.getsize(path) / 1e6:6.2f} MB file, {blobs:,} bodies, "
+                  f"backup {backup_ms:6.1f} ms, open trip {read_ms:.3f} ms")
+
+        print(f"{total:,} trips, {raw_bytes / 1e6:.2f} MB of itinerary text, {len(set(texts)):,} unique")
+        await build("inline")
+        await build("zstd" if zstandard else "zlib")
+        if zstandard is not None:
+            await build("zstd+dict")
+
+    asyncio.run(train() if sys.argv[1:2] == ["train"] else bench())
@@ -0,0 +1,146 @@
+import base64
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Base
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Trip(Base):
+    __tablename__ = "trips"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    destination = Column(String, nullable=False)
+    days = Column(Integer, nullable=False)
+    budget = Column(Float, nullable=False)
+    start_date = Column(String, nullable=False)
+    end_date = Column(String, nullable=False)
+    # The TripRequest as JSON
+    request = Column(Text, nullable=False)
+    # Compressed body in itinerary_blobs, shared by trips with identical text
+    blob_hash = Column(String(32), ForeignKey("itinerary_blobs.hash"), nullable=False)
+    # JSON with the blob hashes of the introduction, each day and the rest, see models/trip_days.py
+    segments = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+
+    # History is read newest first per user; id breaks created_at ties
+    __table_args__ = (Index("ix_trips_user_created", "user_id", "created_at", "id"),)
+
+    def summary(self) -> Dict:
+        return trip_summary(self)
+
+
+def trip_summary(trip) -> Dict:
+    """History entry for a Trip or a row of SUMMARY_COLUMNS."""
+    return {
+        "id": trip.id,
+        "destination": trip.destination,
+        "days": trip.days,
+        "budget": trip.budget,
+        "startDate": trip.start_date,
+        "endDate": trip.end_date,
+        "created_at": trip.created_at.isoformat(),
+    }
+
+
+def encode_cursor(trip) -> str:
+    return base64.urlsafe_b64encode(f"{trip.created_at.isoformat()}|{trip.id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for a cursor we didn't issue."""
+    try:
+        created_at, trip_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(trip_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+# Columns for history pages; the itinerary body is only loaded for a single trip
+SUMMARY_COLUMNS = (Trip.id, Trip.destination, Trip.days, Trip.budget, Trip.start_date, Trip.end_date, Trip.created_at)
+
+
+async def list_trips(db: AsyncSession, user_id: int, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of a user's trips, newest first, and the cursor for the next page.
+
+    Keyset pagination: each page seeks to (created_at, id) < the last row of the
+    previous page on ix_trips_user_created, so page 1000 costs the same as page 1.
+    """
+    query = select(*SUMMARY_COLUMNS).where(Trip.user_id == user_id)
+    if cursor:
+        query = query.where(tuple_(Trip.created_at, Trip.id) < decode_cursor(cursor))
+    query = query.order_by(Trip.created_at.desc(), Trip.id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return [trip_summary(row) for row in rows[:limit]], next_cursor
+
+
+# Benchmark: python -m models.trip [trips for one user]
+if __name__ == "__main__":
+    import asyncio
+    import sys
+    import tempfile
+    import time
+    from datetime import timedelta
+
+    from sqlalchemy import func, insert
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from database import make_engine
+    from models.itinerary_blob import store_itinerary
+    from models.user import User
+
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    async def bench():
+        engine = make_engine(f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/trips.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessions() as db:
+            db.add(User(id=1, name="Heavy", email="heavy@example.com", password_hash="x"))
+            blob_hash = await store_itinerary(db, "x" * 200)
+            await db.commit()
+            start = datetime(2024, 1, 1)
+            for offset in range(0, total, 10_000):
+                await db.execute(insert(Trip), [{
+                    "user_id": 1, "destination": "Goa", "days": 3, "budget": 20000.0, "start_date": "2025-01-01",
+                    "end_date": "2025-01-03", "request": "{}", "blob_hash": blob_hash,
+                    "created_at": start + timedelta(seconds=i),
+                } for i in range(offset, min(offset + 10_000, total))])
+            await db.commit()
+
+            async def fetch(query):
+                return [trip_summary(row) for row in (await db.execute(query)).all()]
+
+            async def timed(fn, runs=20):
+                begin = time.perf_counter()
+                for _ in range(runs):
+                    await fn()
+                return (time.perf_counter() - begin) / runs * 1000
+
+            # Walk to the last page with cursors, then time first/deep pages both ways
+            cursor, cursors = None, []
+            while True:
+                trips, cursor = await list_trips(db, 1, 20, cursor)
+                if not cursor:
+                    break
+                cursors.append(cursor)
+            for label, index in (("first", 0), ("middle", len(cursors) // 2), ("last", len(cursors) - 1)):
+                keyset = await timed(lambda: list_trips(db, 1, 20, cursors[index]))
+                offset_query = (select(*SUMMARY_COLUMNS).where(Trip.user_id == 1)
+                                .order_by(Trip.created_at.desc(), Trip.id.desc()).offset((index + 1) * 20).limit(20))
+                offset = await timed(lambda: fetch(offset_query))
+                print(f"{label:>6} page: keyset {keyset:.2f} ms, OFFSET {offset:.2f} ms")
+            count = (await db.execute(select(func.count()).select_from(Trip))).scalar()
+            print(f"{count:,} trips for one user, {len(cursors) + 1:,} pages of 20")
+        await engine.dispose()
+
+    asyncio.run(bench())
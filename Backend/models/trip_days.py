@@ -0,0 +1,136 @@
+import json
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.Agent.itinerary_parser import parse_itinerary, split_day_blocks
+from models.itinerary_blob import content_hash, load_itinerary, store_itinerary
+from models.trip import Trip
+
+# Bumped when the split changes; older indexes are re-split on access
+SEGMENTS_VERSION = 3
+
+
+def day_title(block: str) -> str:
+    return block.split("\n", 1)[0].lstrip("#").strip()
+
+
+async def store_segments(db: AsyncSession, itinerary: str) -> str:
+    """
+    Store an itinerary split on its "### Day" headings and return Trip.segments.
+
+    Each day, the introduction and the rest (cost breakdown, considerations)
+    are their own blobs, so serving one day only decompresses that day. Days
+    are content addressed like whole itineraries, and their hash doubles as
+    the ETag.
+    """
+    preamble, days, rest = split_day_blocks(itinerary)
+    return json.dumps({
+        "version": SEGMENTS_VERSION,
+        "introduction": await store_itinerary(db, preamble),
+        "rest": await store_itinerary(db, rest),
+        "days": [{"title": day_title(block), "hash": await store_itinerary(db, block)} for block in days],
+    })
+
+
+async def trip_segments(db: AsyncSession, trip_id: int, user_id: int) -> Optional[Dict]:
+    """
+    The segment index of one of the user's trips, or None if they have no such
+    trip. Trips stored before segments existed, or split by an older version,
+    are split and saved first.
+    """
+    row = (await db.execute(
+        select(Trip.id, Trip.blob_hash, Trip.segments).where(Trip.id == trip_id, Trip.user_id == user_id)
+    )).first()
+    if row is None:
+        return None
+    if row.segments:
+        segments = json.loads(row.segments)
+        if segments.get("version") == SEGMENTS_VERSION:
+            return segments
+    segments = await store_segments(db, await load_itinerary(db, row.blob_hash))
+    trip = await db.get(Trip, trip_id)
+    trip.segments = segments
+    await db.commit()
+    return json.loads(segments)
+
+
+def segments_etag(segments: Dict) -> str:
+    return f'"{content_hash(json.dumps(segments, sort_keys=True))}"'
+
+
+def day_etag(segments: Dict, day: int, structured: bool = False) -> str:
+    digest = segments["days"][day - 1]["hash"]
+    return f'"{digest}-structured"' if structured else f'"{digest}"'
+
+
+async def trip_overview(db: AsyncSession, trip: Trip, segments: Dict) -> Dict:
+    """Summary, cost breakdown and day list: everything the first render needs except the days themselves."""
+    parsed = parse_itinerary(await load_itinerary(db, segments["rest"]))
+    return {
+        **trip.summary(),
+        "introduction": await load_itinerary(db, segments["introduction"]),
+        "costBreakdown": parsed["costBreakdown"],
+        "specialConsiderations": parsed["specialConsiderations"],
+        "dayList": [{"day": i, "title": day["title"]} for i, day in enumerate(segments["days"], 1)],
+    }
+
+
+async def trip_day(db: AsyncSession, segments: Dict, day: int, structured: bool = False) -> Dict:
+    """
+    One day, as its markdown block or (structured=True) in the shape of one
+    entry of food.py's formattedItinerary["days"].
+    """
+    block = await load_itinerary(db, segments["days"][day - 1]["hash"])
+    if not structured:
+        return {"day": day, "title": day_title(block), "markdown": block}
+    parsed = parse_itinerary(block)["days"]
+    return {"day": day, "title": day_title(block), "structured": parsed[0] if parsed else None}
+
+
+# Payload benchmark: python -m models.trip_days [days]
+if __name__ == "__main__":
+    import asyncio
+    import random
+    import sys
+    import tempfile
+    import time
+
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from database import Base, make_engine
+    from models.itinerary_blob import synthetic_itinerary
+    from models.user import User
+
+    async def bench():
+        engine = make_engine(f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/days.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        rng = random.Random(0)
+        async with sessions() as db:
+            db.add(User(id=1, name="Bench", email="bench@example.com", password_hash="x"))
+            for days in (3, 7, 14) if len(sys.argv) < 2 else (int(sys.argv[1]),):
+                itinerary = synthetic_itinerary(rng, "Manali", days)
+                trip = Trip(user_id=1, destination="Manali", days=days, budget=50000.0, start_date="2025-06-01",
+                            end_date="2025-06-10", request="{}", blob_hash=await store_itinerary(db, itinerary),
+                            segments=await store_segments(db, itinerary))
+                db.add(trip)
+                await db.commit()
+
+                full = len(json.dumps({"itinerary": itinerary}).encode("utf-8"))
+                segments = await trip_segments(db, trip.id, 1)
+                first = json.dumps(await trip_overview(db, trip, segments)).encode("utf-8")
+                day = json.dumps(await trip_day(db, segments, 1)).encode("utf-8")
+                runs = 500
+                start = time.perf_counter()
+                for _ in range(runs):
+                    await trip_day(db, await trip_segments(db, trip.id, 1), days)
+                day_ms = (time.perf_counter() - start) / runs * 1000
+                print(f"{days:>2} days: full itinerary {full / 1024:5.1f} KB; overview {len(first) / 1024:4.1f} KB "
+                      f"+ one day {len(day) / 1024:4.1f} KB = {(len(first) + len(day)) / 1024:4.1f} KB "
+                      f"({full / (len(first) + len(day)):.1f}x smaller); day fetch {day_ms:.2f} ms")
+        await engine.dispose()
+
+    asyncio.run(bench())
@@ -0,0 +1,36 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one in-flight call.
+
+    The first caller for a key starts `fn()` as a task; callers arriving while it
+    runs wait on the same task and get the same result or exception. Each waiter
+    is shielded, so a cancelled waiter (e.g. a disconnected client) never cancels
+    the shared call for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,26 @@
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Shared by the scraper, the fine-tuning tools and prompt building
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:  # the encoding is downloaded on first use
+            print(f"tiktoken unavailable ({e}); estimating tokens from length.")
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # ~4 characters per token rule of thumb
+    return max(1, len(text) // 4)
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import httpx
+
+from metrics import UPSTREAM_ERRORS, WEATHER_REQUESTS, WEATHER_UPSTREAM_REQUESTS
+
+WEATHER_API_URL = os.getenv("WEATHER_API_URL", "http://api.openweathermap.org/data/2.5/weather")
+
+
+def normalize_city(city: str) -> str:
+    """Cache key for a city name: collapse whitespace and ignore case."""
+    return " ".join(city.split()).casefold()
+
+
+class WeatherClient:
+    """
+    Shared async client for the OpenWeatherMap current-weather API.
+
+    One pooled httpx.AsyncClient is reused for every lookup, so repeat calls
+    keep their TCP/TLS connection alive. Results are cached per normalized city:
+    fresh entries (younger than `ttl`) are returned directly, stale entries
+    (younger than `ttl + stale_ttl`) are returned immediately while a single
+    background task refreshes them, and anything older is fetched again.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str = WEATHER_API_URL,
+        ttl: float = 600,
+        stale_ttl: float = 3600,
+        timeout: float = 5.0,
+        max_connections: int = 20,
+        max_entries: int = 1024,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = httpx.Timeout(timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_entries = max_entries
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+
+    async def current(self, city: str) -> Dict:
+        """
+        Return {"city", "temperature", "description"} for a city.
+
+        Raises httpx.HTTPStatusError for upstream error statuses and ValueError
+        when the response does not look like a weather payload.
+        """
+        key = normalize_city(city)
+        entry = self._cache.get(key)
+        if entry is not None:
+            fetched_at, result = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                self._cache.move_to_end(key)
+                WEATHER_REQUESTS.inc("fresh")
+                return result
+            if age < self.ttl + self.stale_ttl:
+                self._cache.move_to_end(key)
+                self._refresh(key, city)
+                WEATHER_REQUESTS.inc("stale")
+                return result
+        WEATHER_REQUESTS.inc("fetched")
+        # Shield so a disconnecting caller doesn't cancel a fetch others share
+        return await asyncio.shield(self._refresh(key, city))
+
+    def _refresh(self, key: str, city: str) -> asyncio.Task:
+        # Concurrent misses and revalidations for the same city share one request
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, city))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish_refresh(key, t))
+        return task
+
+    def _finish_refresh(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Nobody awaits a background revalidation, so retrieve its error here
+        # and keep serving the stale entry.
+        if not task.cancelled() and task.exception() is not None and key in self._cache:
+            print("Weather refresh failed:", task.exception())
+
+    async def _fetch(self, key: str, city: str) -> Dict:
+        try:
+            response = await self.client.get(
+                self.base_url,
+                params={"q": city, "appid": self.api_key, "units": "metric"},
+            )
+        except httpx.HTTPError as e:
+            UPSTREAM_ERRORS.inc("weather", type(e).__name__)
+            raise
+        WEATHER_UPSTREAM_REQUESTS.inc(str(response.status_code))
+        if response.status_code >= 500:
+            UPSTREAM_ERRORS.inc("weather", "HTTPStatusError")
+        response.raise_for_status()
+        data = response.json()
+
+        if "main" not in data or "weather" not in data:
+            raise ValueError("Unexpected response from weather API")
+
+        result = {
+            "city": data.get("name", city),
+            "temperature": round(data["main"]["temp"], 1),
+            "description": data["weather"][0]["description"],
+        }
+        self._cache[key] = (time.monotonic(), result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return result
+
+
+_weather_client: Optional[WeatherClient] = None
+
+
+def get_weather_client() -> WeatherClient:
+    global _weather_client
+    if _weather_client is None:
+        _weather_client = WeatherClient(
+            api_key=os.getenv("API_KEY"),
+            ttl=float(os.getenv("WEATHER_CACHE_TTL", "600")),
+            stale_ttl=float(os.getenv("WEATHER_STALE_TTL", "3600")),
+            timeout=float(os.getenv("WEATHER_TIMEOUT", "5")),
+        )
+    return _weather_client
+
+
+async def close_weather_client():
+    global _weather_client
+    if _weather_client is not None:
+        await _weather_client.aclose()
+        _weather_client = None